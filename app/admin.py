@@ -2,57 +2,132 @@
 
 from __future__ import annotations
 
-from typing import Dict, List
+import time
+from typing import Dict, List, Optional, Tuple
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 
-from app.auth import get_current_user
-from app.redis_client import redis_client
+from app import counters, summary_cache
+from app.auth import SESSION_TTL_SECONDS, _session_key, get_current_user
+from app.gemini_client import gemini_metrics
+from app.pagination import decode_cursor, encode_cursor
+from app.redis_client import async_redis_client, pool_stats
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
+ADMIN_PAGE_DEFAULT = 50
+ADMIN_PAGE_MAX = 500
+
+
+async def _list_usernames(limit: int, after: Optional[str] = None) -> Tuple[List[str], bool]:
+    """Return a page of usernames in alphabetical order from the user index."""
+
+    usernames = await async_redis_client.zrangebylex(
+        counters.USERS_INDEX_KEY, f"({after}" if after else "-", "+", start=0, num=limit + 1
+    )
+    return usernames[:limit], len(usernames) > limit
+
+
+async def _session_entries(
+    limit: int, before: Optional[Tuple[float, str]] = None
+) -> List[Tuple[str, float]]:
+    """Return up to ``limit + 1`` live ``(token, created_at)`` pairs, newest first.
+
+    Members with equal scores come back in reverse lexicographic order, so ties
+    with the cursor's score are skipped until the cursor's token is passed.
+    """
+
+    cutoff = time.time() - SESSION_TTL_SECONDS
+    entries: List[Tuple[str, float]] = []
+    offset = 0
+    while True:
+        batch = await async_redis_client.zrevrangebyscore(
+            counters.SESSIONS_INDEX_KEY,
+            before[0] if before else "+inf",
+            cutoff,
+            start=offset,
+            num=limit + 1,
+            withscores=True,
+        )
+        for token, score in batch:
+            if before and score == before[0] and token >= before[1]:
+                continue
+            entries.append((token, score))
+        if len(entries) > limit or len(batch) <= limit:
+            return entries[: limit + 1]
+        offset += len(batch)
+
+
+async def _list_sessions(
+    limit: int, before: Optional[Tuple[float, str]] = None
+) -> Tuple[List[Dict[str, str]], Optional[Tuple[float, str]]]:
+    """Return a page of sessions and the ``(created_at, token)`` to resume after."""
+
+    entries = await _session_entries(limit, before)
+    page = entries[:limit]
+    async with async_redis_client.pipeline(transaction=False) as pipe:
+        for token, _ in page:
+            pipe.hgetall(_session_key(token))
+        results = await pipe.execute()
 
-def _list_usernames() -> List[str]:
-    usernames: List[str] = []
-    for key in redis_client.scan_iter(match="user:*"):
-        _, username = key.split(":", 1)
-        usernames.append(username)
-    usernames.sort()
-    return usernames
-
-
-def _list_sessions() -> List[Dict[str, str]]:
     sessions: List[Dict[str, str]] = []
-    for key in redis_client.scan_iter(match="session:*"):
-        data = redis_client.hgetall(key)
+    for (token, _), data in zip(page, results):
+        # Index entries can briefly outlive sessions that expired on their own.
         if data:
-            sessions.append({"token": key.split(":", 1)[1], **data})
-    sessions.sort(key=lambda session: session.get("created_at", ""), reverse=True)
-    return sessions
+            sessions.append({"token": token, **data})
+    last = (page[-1][1], page[-1][0]) if len(entries) > limit else None
+    return sessions, last
 
 
-def _count_diary_entries() -> int:
-    count = 0
-    for key in redis_client.scan_iter(match="chat:*"):
-        count += redis_client.llen(key)
-    return count
+def _decode_session_cursor(cursor: str) -> Tuple[float, str]:
+    score, token = decode_cursor(cursor, 2)
+    try:
+        return float(score), token
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor") from exc
 
 
 @router.get("/dashboard")
-def admin_dashboard(username: str = Depends(get_current_user)):
-    return {
-        "current_user": username,
-        "total_users": len(_list_usernames()),
-        "active_sessions": len(_list_sessions()),
-        "stored_messages": _count_diary_entries(),
-    }
+async def admin_dashboard(username: str = Depends(get_current_user)):
+    return {"current_user": username, **await counters.snapshot(SESSION_TTL_SECONDS)}
+
+
+@router.get("/redis-pool")
+async def redis_pool_stats(_: str = Depends(get_current_user)):
+    return pool_stats()
+
+
+@router.get("/summary-cache")
+async def summary_cache_stats(_: str = Depends(get_current_user)):
+    return await summary_cache.stats()
+
+
+@router.get("/gemini")
+async def gemini_client_stats(_: str = Depends(get_current_user)):
+    return gemini_metrics()
 
 
 @router.get("/users")
-def list_users(_: str = Depends(get_current_user)):
-    return {"users": _list_usernames()}
+async def list_users(
+    limit: int = Query(ADMIN_PAGE_DEFAULT, ge=1, le=ADMIN_PAGE_MAX),
+    cursor: Optional[str] = None,
+    _: str = Depends(get_current_user),
+):
+    after = decode_cursor(cursor, 1)[0] if cursor else None
+    usernames, has_more = await _list_usernames(limit, after)
+    next_cursor = encode_cursor(usernames[-1]) if has_more else None
+    return {"users": usernames, "next_cursor": next_cursor}
 
 
 @router.get("/sessions")
-def list_sessions(_: str = Depends(get_current_user)):
-    return {"sessions": _list_sessions()}
+async def list_sessions(
+    limit: int = Query(ADMIN_PAGE_DEFAULT, ge=1, le=ADMIN_PAGE_MAX),
+    cursor: Optional[str] = None,
+    _: str = Depends(get_current_user),
+):
+    """Return live sessions, most recently created first."""
+
+    before = _decode_session_cursor(cursor) if cursor else None
+    sessions, last = await _list_sessions(limit, before)
+    next_cursor = encode_cursor(repr(last[0]), last[1]) if last else None
+    return {"sessions": sessions, "next_cursor": next_cursor}
@@ -0,0 +1,121 @@
+"""Mood and activity trend analytics over per-day features."""
+
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta, timezone
+from typing import Literal, Optional
+
+import numpy as np
+import pandas as pd
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from app import features
+from app.auth import get_current_user
+from app.models import MoodTrends, StreakStats, TrendBucket, TrendPoint
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+DEFAULT_RANGE_DAYS = 90
+MAX_RANGE_DAYS = 366 * 5
+# Same thresholds as the mood label attached to summaries.
+POSITIVE_THRESHOLD = 1
+NEGATIVE_THRESHOLD = -1
+BUCKET_RULES = {"day": "D", "week": "W-MON", "month": "MS"}
+
+
+def _daily_frame(raw: dict, start: date, end: date) -> pd.DataFrame:
+    """Build a dense day-indexed frame for ``start..end`` from sparse features."""
+
+    index = pd.date_range(start, end, freq="D")
+    frame = pd.DataFrame(
+        {
+            name: pd.Series(
+                list(values.values()), index=pd.DatetimeIndex(list(values.keys())), dtype="float64"
+            )
+            for name, values in raw.items()
+        }
+    )
+    return frame.reindex(index, fill_value=0.0).fillna(0.0)
+
+
+def _mood_labels(frame: pd.DataFrame) -> np.ndarray:
+    mood = frame["mood"].to_numpy()
+    active = frame["messages"].to_numpy() > 0
+    labels = np.select(
+        [mood > POSITIVE_THRESHOLD, mood < NEGATIVE_THRESHOLD], ["positive", "negative"], "neutral"
+    )
+    return np.where(active, labels, "")
+
+
+def _streaks(active: pd.Series) -> StreakStats:
+    # Number each run of active days and count its length cumulatively.
+    run_ids = (~active).cumsum()
+    run_lengths = active.astype(int).groupby(run_ids).cumsum()
+    return StreakStats(
+        current=int(run_lengths.iloc[-1]) if len(run_lengths) else 0,
+        longest=int(run_lengths.max()) if len(run_lengths) else 0,
+    )
+
+
+@router.get("/trends", response_model=MoodTrends)
+async def mood_trends(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    bucket: Literal["day", "week", "month"] = "week",
+    window: int = Query(7, ge=1, le=90),
+    username: str = Depends(get_current_user),
+) -> MoodTrends:
+    """Mood distribution, rolling mood average, streaks and message volume.
+
+    ``window`` is the rolling average length in days; days without messages
+    are skipped rather than counted as neutral.
+    """
+
+    end = end_date or datetime.now(timezone.utc).date()
+    start = start_date or end - timedelta(days=DEFAULT_RANGE_DAYS - 1)
+    if start > end or (end - start).days >= MAX_RANGE_DAYS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid date range")
+
+    frame = _daily_frame(await features.load(username), start, end)
+    active = frame["messages"] > 0
+    frame["label"] = _mood_labels(frame)
+    for label in ("positive", "neutral", "negative"):
+        frame[label] = (frame["label"] == label).astype(int)
+    frame["active_days"] = active.astype(int)
+
+    # Buckets are labelled by their first day: weeks run Monday to Sunday.
+    grouped = frame.resample(BUCKET_RULES[bucket], label="left", closed="left")
+    sums = grouped[["messages", "words", "active_days", "positive", "neutral", "negative", "mood"]].sum()
+    mean_mood = sums["mood"] / sums["active_days"].replace(0, np.nan)
+
+    buckets = [
+        TrendBucket(
+            start=period.date(),
+            messages=int(row.messages),
+            words=int(row.words),
+            active_days=int(row.active_days),
+            mood_distribution={
+                "positive": int(row.positive),
+                "neutral": int(row.neutral),
+                "negative": int(row.negative),
+            },
+            average_mood=None if np.isnan(mean_mood[period]) else round(float(mean_mood[period]), 3),
+        )
+        for period, row in sums.iterrows()
+    ]
+
+    rolling = frame["mood"].where(active).rolling(window, min_periods=1).mean()
+    rolling_mood = [
+        TrendPoint(date=day.date(), value=round(float(value), 3))
+        for day, value in rolling.items()
+        if not np.isnan(value)
+    ]
+
+    return MoodTrends(
+        start_date=start,
+        end_date=end,
+        bucket=bucket,
+        buckets=buckets,
+        rolling_mood=rolling_mood,
+        streaks=_streaks(active),
+    )
@@ -7,9 +7,12 @@ from datetime import datetime, timedelta, timezone
 
 import bcrypt
 from fastapi import APIRouter, Depends, Header, HTTPException, status
+from redis.exceptions import WatchError
+from starlette.concurrency import run_in_threadpool
 
+from app import counters
 from app.models import TokenData, UserLogin, UserProfile, UserRegister
-from app.redis_client import redis_client
+from app.redis_client import async_redis_client
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -24,7 +27,7 @@ def _session_key(token: str) -> str:
     return f"session:{token}"
 
 
-def get_current_user(
+async def get_current_user(
     authorization: str | None = Header(default=None, alias="Authorization")
 ) -> str:
     """Resolve the username for the current session token.
@@ -36,57 +39,84 @@ def get_current_user(
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing token")
 
     token = authorization.split(" ", 1)[1]
-    username = redis_client.hget(_session_key(token), "username")
+    username = await async_redis_client.hget(_session_key(token), "username")
     if not username:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
     return username
 
 
 @router.post("/signup")
-def register(data: UserRegister):
+async def register(data: UserRegister):
     key = _user_key(data.username)
-    if redis_client.exists(key):
+    if await async_redis_client.exists(key):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="User already exists")
 
-    hashed = bcrypt.hashpw(data.password.encode(), bcrypt.gensalt()).decode()
+    # bcrypt is deliberately slow; keep it off the event loop.
+    hashed = await run_in_threadpool(bcrypt.hashpw, data.password.encode(), bcrypt.gensalt())
     created_at = datetime.now(timezone.utc).isoformat()
-    redis_client.hset(key, mapping={"password": hashed, "created_at": created_at})
+    # The user, its counter and its index entry are written in one MULTI.
+    # WATCH closes the race with a concurrent sign-up for the same name, so
+    # it cannot both count as a new user or leave a half-registered user.
+    async with async_redis_client.pipeline(transaction=True) as pipe:
+        try:
+            await pipe.watch(key)
+            if await pipe.exists(key):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST, detail="User already exists"
+                )
+            pipe.multi()
+            pipe.hset(key, mapping={"password": hashed.decode(), "created_at": created_at})
+            counters.incr(pipe, "users")
+            counters.record_user(pipe, data.username)
+            await pipe.execute()
+        except WatchError as exc:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="User already exists"
+            ) from exc
 
     return {"status": "success", "message": "User registered successfully"}
 
 
 @router.post("/login")
-def login(data: UserLogin):
+async def login(data: UserLogin):
     key = _user_key(data.username)
-    stored_hash = redis_client.hget(key, "password")
-    if not stored_hash or not bcrypt.checkpw(data.password.encode(), stored_hash.encode()):
+    stored_hash = await async_redis_client.hget(key, "password")
+    if not stored_hash or not await run_in_threadpool(
+        bcrypt.checkpw, data.password.encode(), stored_hash.encode()
+    ):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
 
     token = str(uuid.uuid4())
     session_key = _session_key(token)
     now = datetime.now(timezone.utc)
-    redis_client.hset(
-        session_key,
-        mapping={
-            "username": data.username,
-            "created_at": now.isoformat(),
-            "expires_at": (now + timedelta(seconds=SESSION_TTL_SECONDS)).isoformat(),
-        },
-    )
-    redis_client.expire(session_key, SESSION_TTL_SECONDS)
+    async with async_redis_client.pipeline(transaction=True) as pipe:
+        pipe.hset(
+            session_key,
+            mapping={
+                "username": data.username,
+                "created_at": now.isoformat(),
+                "expires_at": (now + timedelta(seconds=SESSION_TTL_SECONDS)).isoformat(),
+            },
+        )
+        pipe.expire(session_key, SESSION_TTL_SECONDS)
+        counters.record_session(pipe, token, now.timestamp())
+        await pipe.execute()
 
     return {"status": "success", "token": token, "expires_in": SESSION_TTL_SECONDS}
 
 
 @router.post("/logout")
-def logout(token_data: TokenData):
-    redis_client.delete(_session_key(token_data.token))
+async def logout(token_data: TokenData):
+    async with async_redis_client.pipeline(transaction=True) as pipe:
+        pipe.delete(_session_key(token_data.token))
+        counters.forget_session(pipe, token_data.token)
+        await pipe.execute()
     return {"status": "success", "message": "Logged out successfully"}
 
 
 @router.get("/me", response_model=UserProfile)
-def read_profile(username: str = Depends(get_current_user)) -> UserProfile:
-    user_raw = redis_client.hgetall(_user_key(username))
+async def read_profile(username: str = Depends(get_current_user)) -> UserProfile:
+    user_raw = await async_redis_client.hgetall(_user_key(username))
     if not user_raw:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
@@ -0,0 +1,100 @@
+"""Measure the CPU cost of rendering large timelines.
+
+Compares building ``DiaryTimeline`` models and serialising them the way
+FastAPI does for a ``response_model`` against splicing the stored values into
+the body, on synthetic data and without Redis.
+
+Run with ``python -m app.benchmark [--days N] [--messages N] [--repeat N]``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, List, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+from app.codec import decode_message, encode_message, timeline_body, timeline_entry_json
+from app.models import ChatMessage, DiarySummary, DiaryTimeline, DiaryTimelineEntry
+
+StoredDay = Tuple[date, List[bytes], Optional[bytes]]
+
+
+def _synthetic_days(days: int, messages: int) -> List[StoredDay]:
+    start = datetime(2024, 1, 1, 8, tzinfo=timezone.utc)
+    stored: List[StoredDay] = []
+    for offset in range(days):
+        moment = start + timedelta(days=offset)
+        raw_messages = [
+            encode_message(
+                ChatMessage(
+                    message_id=str(uuid.uuid4()),
+                    role="user" if index % 2 == 0 else "assistant",
+                    text=f"Message {index} about work, friends and a long walk by the river.",
+                    timestamp=moment + timedelta(minutes=index),
+                )
+            )
+            for index in range(messages)
+        ]
+        summary = DiarySummary(
+            date=moment.date(),
+            summary="A busy but good day with a long walk in the evening.",
+            mood="positive",
+            highlights=["long walk", "finished the report"],
+            tags=["walk", "work"],
+        )
+        stored.append((moment.date(), raw_messages, summary.json().encode()))
+    return stored
+
+
+def render_models(stored: List[StoredDay]) -> bytes:
+    entries = []
+    for day, raw_messages, raw_summary in stored:
+        messages = [decode_message(raw) for raw in raw_messages]
+        if messages:
+            summary = DiarySummary.parse_raw(raw_summary) if raw_summary else None
+            entries.append(DiaryTimelineEntry(date=day, messages=messages, summary=summary))
+    timeline = DiaryTimeline(entries=entries, next_cursor=None)
+    return json.dumps(jsonable_encoder(timeline)).encode()
+
+
+def render_raw(stored: List[StoredDay]) -> bytes:
+    entries = [timeline_entry_json(day, messages, summary) for day, messages, summary in stored]
+    return timeline_body([entry for entry in entries if entry is not None], None)
+
+
+def _cpu_seconds(
+    render: Callable[[List[StoredDay]], bytes], stored: List[StoredDay], repeat: int
+) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.process_time()
+        render(stored)
+        best = min(best, time.process_time() - started)
+    return best
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.benchmark", description=__doc__)
+    parser.add_argument("--days", type=int, default=366)
+    parser.add_argument("--messages", type=int, default=40, help="Messages per day.")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    stored = _synthetic_days(args.days, args.messages)
+    if json.loads(render_models(stored)) != json.loads(render_raw(stored)):
+        raise SystemExit("Rendered timelines differ")
+
+    models = _cpu_seconds(render_models, stored, args.repeat)
+    raw = _cpu_seconds(render_raw, stored, args.repeat)
+    print(f"{args.days} days x {args.messages} messages, best of {args.repeat}:")
+    print(f"  models + jsonable_encoder: {models * 1000:8.1f} ms CPU")
+    print(f"  spliced stored values:     {raw * 1000:8.1f} ms CPU ({models / raw:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Storage encoding for chat messages.
+
+Messages used to be stored as pydantic JSON.  The compact format is a version
+byte followed by a msgpack array whose layout that version defines:
+
+``0x01`` ``[message_id, role, text, timestamp_us]``
+    ``message_id`` is the 16 raw UUID bytes (or the original string if it is
+    not a UUID), ``role`` is an index into :data:`ROLES` and ``timestamp_us``
+    is microseconds since the Unix epoch in UTC, which keeps timestamps exact
+    at the same nine bytes epoch milliseconds would take.
+
+Readers accept both formats: legacy JSON always starts with ``{``, which is
+never a valid version byte.  ``MESSAGE_CODEC=json`` switches writers back to
+JSON, e.g. while rolling back a deployment.
+
+The ``*_json`` helpers render responses straight from stored values.  They
+need no Redis connection, so ``python -m app.benchmark`` can use them offline.
+"""
+
+from __future__ import annotations
+
+import os
+import uuid
+from datetime import date, datetime, timezone
+from typing import Iterable, List, Optional, Tuple, Union
+
+import msgpack
+import orjson
+
+from app.models import ChatMessage
+
+VERSION_MSGPACK_V1 = 1
+ROLES = ("user", "assistant")
+MESSAGE_CODEC = os.getenv("MESSAGE_CODEC", "msgpack")
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _orjson_options() -> int:
+    # Render datetimes exactly like the installed pydantic does: v1 writes UTC
+    # as "+00:00", v2 as "Z".
+    sample = ChatMessage(message_id="x", text="x", timestamp=_EPOCH).json()
+    return orjson.OPT_UTC_Z if '00Z"' in sample else 0
+
+
+_ORJSON_OPTIONS = _orjson_options()
+
+
+class CodecError(ValueError):
+    """Raised when a stored message cannot be decoded."""
+
+
+def _timestamp_us(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    delta = value - _EPOCH
+    return (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _pack_id(message_id: str) -> Union[bytes, str]:
+    try:
+        parsed = uuid.UUID(message_id)
+    except ValueError:
+        return message_id
+    return parsed.bytes if str(parsed) == message_id else message_id
+
+
+def encode_message(message: ChatMessage) -> bytes:
+    if MESSAGE_CODEC == "json":
+        return message.json().encode()
+    payload = [
+        _pack_id(message.message_id),
+        ROLES.index(message.role),
+        message.text,
+        _timestamp_us(message.timestamp),
+    ]
+    return bytes([VERSION_MSGPACK_V1]) + msgpack.packb(payload, use_bin_type=True)
+
+
+def is_legacy(raw: Union[bytes, str]) -> bool:
+    if isinstance(raw, str):
+        return True
+    return not raw or raw[0] != VERSION_MSGPACK_V1
+
+
+def _unpack(raw: bytes) -> Tuple[str, str, str, datetime]:
+    try:
+        message_id, role, text, timestamp_us = msgpack.unpackb(raw[1:], raw=False)
+        if isinstance(message_id, bytes):
+            message_id = str(uuid.UUID(bytes=message_id))
+        seconds, micros = divmod(timestamp_us, 1_000_000)
+        timestamp = datetime.fromtimestamp(seconds, tz=timezone.utc).replace(microsecond=micros)
+        return message_id, ROLES[role], text, timestamp
+    except (ValueError, TypeError, IndexError, msgpack.UnpackException) as exc:
+        raise CodecError("Unable to decode stored message") from exc
+
+
+def decode_message(raw: Union[bytes, str]) -> ChatMessage:
+    if is_legacy(raw):
+        return ChatMessage.parse_raw(raw)
+    message_id, role, text, timestamp = _unpack(raw)
+    return ChatMessage(message_id=message_id, role=role, text=text, timestamp=timestamp)
+
+
+def message_json(raw: Union[bytes, str]) -> bytes:
+    """Return the stored message as the JSON the API serves, without a model.
+
+    Messages are validated by :class:`ChatMessage` before they are written, so
+    legacy JSON is passed through verbatim and binary entries are rendered
+    straight from their fields.
+    """
+
+    if is_legacy(raw):
+        return raw.encode() if isinstance(raw, str) else raw
+    message_id, role, text, timestamp = _unpack(raw)
+    return orjson.dumps(
+        {"message_id": message_id, "role": role, "text": text, "timestamp": timestamp},
+        option=_ORJSON_OPTIONS,
+    )
+
+
+def json_array(items: Iterable[bytes]) -> bytes:
+    return b"[" + b",".join(items) + b"]"
+
+
+def timeline_entry_json(
+    day: date, raw_messages: Iterable[Union[bytes, str]], raw_summary: Optional[bytes]
+) -> Optional[bytes]:
+    """Render one ``DiaryTimelineEntry`` as JSON straight from its stored values.
+
+    Stored messages and summaries are validated by their models when written,
+    so they are spliced into the body instead of being parsed and re-serialised.
+    Returns ``None`` for days without messages.
+    """
+
+    messages: List[bytes] = []
+    for raw in raw_messages:
+        try:
+            messages.append(message_json(raw))
+        except Exception:  # pragma: no cover - defensive against bad data
+            continue
+    if not messages:
+        return None
+    return b"".join(
+        (
+            b'{"date":"',
+            day.isoformat().encode(),
+            b'","messages":',
+            json_array(messages),
+            b',"summary":',
+            raw_summary or b"null",
+            b"}",
+        )
+    )
+
+
+def timeline_body(entries: List[bytes], next_cursor: Optional[str]) -> bytes:
+    return b'{"entries":' + json_array(entries) + b',"next_cursor":' + orjson.dumps(next_cursor) + b"}"
+
+
+__all__ = [
+    "CodecError",
+    "encode_message",
+    "decode_message",
+    "is_legacy",
+    "message_json",
+    "json_array",
+    "timeline_entry_json",
+    "timeline_body",
+]
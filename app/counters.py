@@ -0,0 +1,67 @@
+"""Incrementally maintained counters behind the admin dashboard.
+
+Totals for users and stored messages live in the ``stats:counts`` hash and are
+bumped in the same pipeline as the write they describe.  Sessions are tracked
+in the ``sessions:by_created`` sorted set scored by creation time; because
+every session shares the same TTL, the live sessions are exactly those created
+within the last TTL seconds, so expired entries can be trimmed lazily.
+Usernames are kept in the ``users:index`` sorted set (all scores 0, so it is
+ordered lexicographically) for paginated listings.
+``python -m app.migrate reconcile-counters`` rebuilds everything from the
+keyspace to repair any drift.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Dict
+
+from app.redis_client import async_redis_client
+
+COUNTS_KEY = "stats:counts"
+SESSIONS_INDEX_KEY = "sessions:by_created"
+USERS_INDEX_KEY = "users:index"
+
+
+def incr(pipe, field: str, amount: int = 1) -> None:
+    pipe.hincrby(COUNTS_KEY, field, amount)
+
+
+def record_user(pipe, username: str) -> None:
+    pipe.zadd(USERS_INDEX_KEY, {username: 0})
+
+
+def record_session(pipe, token: str, created_at: float) -> None:
+    pipe.zadd(SESSIONS_INDEX_KEY, {token: created_at})
+
+
+def forget_session(pipe, token: str) -> None:
+    pipe.zrem(SESSIONS_INDEX_KEY, token)
+
+
+async def snapshot(session_ttl_seconds: int) -> Dict[str, int]:
+    """Return the dashboard counters, dropping sessions that have expired."""
+
+    cutoff = time.time() - session_ttl_seconds
+    async with async_redis_client.pipeline(transaction=False) as pipe:
+        pipe.zremrangebyscore(SESSIONS_INDEX_KEY, "-inf", f"({cutoff}")
+        pipe.zcard(SESSIONS_INDEX_KEY)
+        pipe.hgetall(COUNTS_KEY)
+        _, sessions, counts = await pipe.execute()
+    return {
+        "total_users": int(counts.get("users", 0)),
+        "active_sessions": int(sessions),
+        "stored_messages": int(counts.get("messages", 0)),
+    }
+
+
+__all__ = [
+    "COUNTS_KEY",
+    "SESSIONS_INDEX_KEY",
+    "USERS_INDEX_KEY",
+    "incr",
+    "record_user",
+    "record_session",
+    "forget_session",
+    "snapshot",
+]
@@ -2,50 +2,65 @@
 
 from __future__ import annotations
 
+import asyncio
+import os
+import time
 import uuid
-from collections import Counter
 from datetime import date, datetime, timezone
-from typing import Iterable, List, Optional
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple, Union
 
-from fastapi import APIRouter, Depends, HTTPException, status
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from redis.exceptions import WatchError
 
+from app import counters, features, importer, jobs, summary_cache, tiering, vector_index
 from app.auth import get_current_user
-from app.gemini_client import generate_summary
+from app.codec import (
+    decode_message,
+    encode_message,
+    json_array,
+    message_json,
+    timeline_body,
+    timeline_entry_json,
+)
+from app.gemini_client import (
+    GeminiClientError,
+    estimate_tokens,
+    generate_summary,
+    stream_summary,
+)
 from app.models import (
     ChatMessage,
+    ChatMessageBatch,
+    ChatMessageBatchItem,
     ChatMessageCreate,
+    DiaryMessagePage,
     DiarySummary,
     DiaryTimeline,
-    DiaryTimelineEntry,
+    ImportLineError,
+    ImportReport,
+    SummaryJob,
 )
-from app.redis_client import redis_client
+from app.pagination import decode_cursor, encode_cursor
+from app.redis_client import async_redis_binary_client, async_redis_client
+from app.search_index import index_message, index_summary, load_summary_document
 
 router = APIRouter(prefix="/diary", tags=["diary"])
 
-POSITIVE_WORDS = {
-    "happy",
-    "excited",
-    "great",
-    "awesome",
-    "amazing",
-    "love",
-    "joy",
-    "good",
-    "fantastic",
-    "proud",
-}
-NEGATIVE_WORDS = {
-    "sad",
-    "tired",
-    "angry",
-    "upset",
-    "bad",
-    "worried",
-    "stress",
-    "stressed",
-    "anxious",
-    "frustrated",
-}
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", 7 * 24 * 60 * 60))
+TIMELINE_DEFAULT_LIMIT = 30
+TIMELINE_MAX_LIMIT = 366
+# Days loaded per Redis round trip while streaming a timeline.
+TIMELINE_STREAM_BATCH = 14
+# Bump whenever the prompts or the heuristic fields change so cached
+# summaries generated from the old template are no longer reused.
+SUMMARY_PROMPT_VERSION = "4"
+# Estimated transcript tokens per prompt before a day is summarised in chunks.
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", 6000))
+MESSAGE_READ_CHUNK = 500
+MESSAGES_PAGE_DEFAULT = 100
+MESSAGES_PAGE_MAX = 1000
 
 
 def _chat_key(username: str, day: date) -> str:
@@ -56,29 +71,228 @@ def _summary_key(username: str, day: date) -> str:
     return f"summary:{username}:{day.isoformat()}"
 
 
-def _load_messages(username: str, day: date) -> List[ChatMessage]:
-    key = _chat_key(username, day)
-    raw_messages = redis_client.lrange(key, 0, -1)
+def _days_key(username: str) -> str:
+    """Sorted set of the user's diary days, scored by ``date.toordinal()``."""
+
+    return f"days:{username}"
+
+
+def _index_day(pipe, username: str, day: date) -> None:
+    pipe.zadd(_days_key(username), {day.isoformat(): day.toordinal()})
+
+
+async def _list_days(username: str, newest_first: bool = True) -> List[date]:
+    """Return the user's indexed diary days without scanning the keyspace."""
+
+    key = _days_key(username)
+    if newest_first:
+        members = await async_redis_client.zrevrange(key, 0, -1)
+    else:
+        members = await async_redis_client.zrange(key, 0, -1)
+    return [date.fromisoformat(member) for member in members]
+
+
+async def _page_days(
+    username: str,
+    limit: int,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    before: Optional[date] = None,
+) -> Tuple[List[date], bool]:
+    """Return up to ``limit`` indexed days, newest first, and whether more remain."""
+
+    upper_bounds = []
+    if end:
+        upper_bounds.append(end.toordinal())
+    if before:
+        # Cursors point at the last day already returned, so exclude it.
+        upper_bounds.append(before.toordinal() - 1)
+    members = await async_redis_client.zrevrangebyscore(
+        _days_key(username),
+        min(upper_bounds) if upper_bounds else "+inf",
+        start.toordinal() if start else "-inf",
+        start=0,
+        num=limit + 1,
+    )
+    days = [date.fromisoformat(member) for member in members]
+    return days[:limit], len(days) > limit
+
+
+def _parse_date_param(value: Optional[str], name: str) -> Optional[date]:
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid {name} format"
+        ) from exc
+
+
+def _parse_messages(raw_messages: Iterable[Union[bytes, str]]) -> List[ChatMessage]:
     messages: List[ChatMessage] = []
     for raw in raw_messages:
         try:
-            messages.append(ChatMessage.parse_raw(raw))
+            messages.append(decode_message(raw))
         except Exception:  # pragma: no cover - defensive against bad data
             continue
     return messages
 
 
-def _store_message(username: str, message: ChatMessage) -> None:
-    key = _chat_key(username, message.timestamp.date())
-    redis_client.rpush(key, message.json())
-
-
-def _store_summary(username: str, summary: DiarySummary) -> None:
-    redis_client.set(_summary_key(username, summary.date), summary.json())
-
+async def _load_messages(username: str, day: date) -> List[ChatMessage]:
+    """Load the whole day, reading the list ``MESSAGE_READ_CHUNK`` entries at a time.
+
+    The blob, the first window and the list length are read in one ``MULTI``.
+    Later windows only ever grow the list, unless the day is compacted
+    meanwhile; a window that comes back short restarts the read.
+    """
+
+    chat_key = _chat_key(username, day)
+    while True:
+        async with async_redis_binary_client.pipeline() as pipe:
+            tiering.queue_load(pipe, chat_key, 0, MESSAGE_READ_CHUNK - 1)
+            pipe.llen(chat_key)
+            blob, window, hot_count = await pipe.execute()
+        raw_messages = list(tiering.merge(blob, window))
+        start = len(window)
+        while start < hot_count:
+            window = await async_redis_binary_client.lrange(
+                chat_key, start, start + MESSAGE_READ_CHUNK - 1
+            )
+            if not window:
+                break
+            raw_messages.extend(window)
+            start += len(window)
+        if start >= hot_count:
+            return _parse_messages(raw_messages)
+
+
+async def _load_message_range(
+    username: str, day: date, start: int, count: int
+) -> Tuple[List[bytes], int]:
+    """Return up to ``count`` stored messages from position ``start`` and the day's total.
+
+    The cold count is read under ``WATCH`` and everything else in one ``MULTI``,
+    so a compaction in between makes the read retry instead of skipping messages.
+    """
+
+    chat_key = _chat_key(username, day)
+    cold_key = tiering.cold_key(chat_key)
+    async with async_redis_binary_client.pipeline() as pipe:
+        while True:
+            try:
+                await pipe.watch(cold_key)
+                cold = int(await pipe.hget(cold_key, "count") or 0)
+                hot_start = max(start - cold, 0)
+                hot_stop = start + count - cold - 1
+                pipe.multi()
+                pipe.llen(chat_key)
+                if start < cold:
+                    pipe.hget(cold_key, "messages")
+                if hot_stop >= 0:
+                    pipe.lrange(chat_key, hot_start, hot_stop)
+                hot_count, *parts = await pipe.execute()
+                break
+            except WatchError:
+                continue
+
+    raw_messages: List[bytes] = []
+    if start < cold:
+        blob = parts.pop(0)
+        raw_messages.extend(tiering.unpack(blob)[start : start + count] if blob else [])
+    if hot_stop >= 0:
+        raw_messages.extend(parts.pop(0))
+    return raw_messages, cold + hot_count
+
+
+def _queue_messages(pipe, username: str, messages: List[ChatMessage]) -> None:
+    """Queue appending ``messages`` to their days and updating every index."""
+
+    by_day: Dict[date, List[ChatMessage]] = {}
+    for message in messages:
+        by_day.setdefault(message.timestamp.date(), []).append(message)
 
-def _load_summary(username: str, day: date) -> Optional[DiarySummary]:
-    raw = redis_client.get(_summary_key(username, day))
+    for day, day_messages in by_day.items():
+        pipe.rpush(_chat_key(username, day), *(encode_message(message) for message in day_messages))
+        _index_day(pipe, username, day)
+        summary_cache.invalidate(pipe, username, day)
+    for message in messages:
+        index_message(pipe, username, message)
+    vector_index.add_messages(pipe, username, messages)
+    counters.incr(pipe, "messages", len(messages))
+    features.record_messages(pipe, username, messages)
+
+
+async def _store_messages(username: str, messages: List[ChatMessage]) -> None:
+    async with async_redis_client.pipeline() as pipe:
+        _queue_messages(pipe, username, messages)
+        await pipe.execute()
+
+
+async def _store_message(username: str, message: ChatMessage) -> None:
+    await _store_messages(username, [message])
+
+
+def _idempotency_key(username: str, key: str) -> str:
+    return f"idem:{username}:{key}"
+
+
+async def _store_batch(username: str, items: List[ChatMessageBatchItem]) -> List[ChatMessage]:
+    """Store ``items`` once per idempotency key and return the stored messages.
+
+    Keys already seen return the message stored the first time.  The keys are
+    watched while the new messages are written, so concurrent replays of the
+    same batch retry against each other instead of storing duplicates.
+    """
+
+    keys = [_idempotency_key(username, item.idempotency_key) for item in items]
+    async with async_redis_binary_client.pipeline() as pipe:
+        while True:
+            try:
+                await pipe.watch(*keys)
+                existing = await pipe.mget(keys)
+                now = datetime.now(timezone.utc)
+                stored: Dict[str, ChatMessage] = {
+                    key: decode_message(raw) for key, raw in zip(keys, existing) if raw
+                }
+                new_keys: List[str] = []
+                for key, item in zip(keys, items):
+                    if key in stored:
+                        continue
+                    stored[key] = ChatMessage(
+                        message_id=str(uuid.uuid4()), role=item.role, text=item.text, timestamp=now
+                    )
+                    new_keys.append(key)
+
+                pipe.multi()
+                if new_keys:
+                    _queue_messages(pipe, username, [stored[key] for key in new_keys])
+                    for key in new_keys:
+                        pipe.set(key, encode_message(stored[key]), ex=IDEMPOTENCY_TTL_SECONDS)
+                await pipe.execute()
+                return [stored[key] for key in keys]
+            except WatchError:
+                continue
+
+
+async def _store_summary(
+    username: str, summary: DiarySummary, digest: Optional[str] = None, message_count: int = 0
+) -> None:
+    previous = await load_summary_document(username, summary.date)
+    async with async_redis_client.pipeline() as pipe:
+        pipe.set(_summary_key(username, summary.date), summary.json())
+        _index_day(pipe, username, summary.date)
+        index_summary(pipe, username, summary, previous)
+        if digest:
+            summary_cache.put(pipe, username, digest, summary, message_count)
+        await pipe.execute()
+
+
+async def _load_summary(username: str, day: date) -> Optional[DiarySummary]:
+    return _parse_summary(await async_redis_client.get(_summary_key(username, day)))
+
+
+def _parse_summary(raw: Optional[Union[bytes, str]]) -> Optional[DiarySummary]:
     if not raw:
         return None
     try:
@@ -87,12 +301,52 @@ def _load_summary(username: str, day: date) -> Optional[DiarySummary]:
         return None
 
 
+async def _load_timeline_json(username: str, days: List[date]) -> List[bytes]:
+    """Load and render the timeline entries for ``days`` in one ``MULTI`` round trip."""
+
+    async with async_redis_binary_client.pipeline() as pipe:
+        for day in days:
+            tiering.queue_load(pipe, _chat_key(username, day))
+            pipe.get(_summary_key(username, day))
+        results = await pipe.execute()
+
+    entries = (
+        timeline_entry_json(
+            day, tiering.merge(results[3 * index], results[3 * index + 1]), results[3 * index + 2]
+        )
+        for index, day in enumerate(days)
+    )
+    return [entry for entry in entries if entry is not None]
+
+
+async def _stream_timeline(
+    username: str, start: Optional[date], end: Optional[date]
+) -> AsyncIterator[bytes]:
+    """Yield the timeline as NDJSON, one day per line, newest first.
+
+    Days are paged from the day index a batch at a time, so memory use and
+    time to first byte do not grow with the length of the history.
+    """
+
+    before: Optional[date] = None
+    while True:
+        days, has_more = await _page_days(
+            username, TIMELINE_STREAM_BATCH, start=start, end=end, before=before
+        )
+        for entry in await _load_timeline_json(username, days):
+            yield entry + b"\n"
+        if not has_more:
+            return
+        before = days[-1]
+
+
+def _transcript_line(message: ChatMessage) -> str:
+    timestamp = message.timestamp.astimezone(timezone.utc).isoformat()
+    return f"[{timestamp}] {message.role.upper()}: {message.text}"
+
+
 def _build_prompt(day: date, messages: Iterable[ChatMessage]) -> str:
-    conversations = []
-    for message in messages:
-        timestamp = message.timestamp.astimezone(timezone.utc).isoformat()
-        conversations.append(f"[{timestamp}] {message.role.upper()}: {message.text}")
-    conversation_text = "\n".join(conversations)
+    conversation_text = "\n".join(_transcript_line(message) for message in messages)
     return (
         "You are an empathetic journaling assistant. Summarise the user's day "
         "based on the following chat transcript. Provide a short paragraph "
@@ -107,14 +361,162 @@ def _build_prompt(day: date, messages: Iterable[ChatMessage]) -> str:
     )
 
 
-def _infer_mood(messages: Iterable[ChatMessage]) -> str:
-    score = 0
+def _chunk_messages(messages: List[ChatMessage], budget: int) -> List[List[ChatMessage]]:
+    """Split the day into contiguous chunks of at most ``budget`` transcript tokens.
+
+    Chunks are packed greedily from the start of the day, so appending
+    messages only ever changes the last chunk and earlier chunk summaries stay
+    cached.  A single message over the budget gets a chunk of its own.
+    """
+
+    chunks: List[List[ChatMessage]] = []
+    current: List[ChatMessage] = []
+    used = 0
     for message in messages:
-        if message.role != "user":
-            continue
-        text = message.text.lower()
-        score += sum(1 for word in POSITIVE_WORDS if word in text)
-        score -= sum(1 for word in NEGATIVE_WORDS if word in text)
+        cost = estimate_tokens(_transcript_line(message))
+        if current and used + cost > budget:
+            chunks.append(current)
+            current, used = [], 0
+        current.append(message)
+        used += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _build_chunk_prompt(day: date, part: int, parts: int, messages: List[ChatMessage]) -> str:
+    conversation_text = "\n".join(_transcript_line(message) for message in messages)
+    return (
+        "You are an empathetic journaling assistant. The following is part "
+        f"{part} of {parts} of the user's chat transcript for {day.isoformat()}. "
+        "Summarise what happened and how the user felt in this part in a few "
+        "sentences, keeping concrete events and names.\n"
+        "Transcript:\n"
+        f"{conversation_text}\n"
+    )
+
+
+def _build_merge_prompt(day: date, partials: List[str]) -> str:
+    parts_text = "\n".join(f"Part {index}: {text}" for index, text in enumerate(partials, 1))
+    return (
+        "You are an empathetic journaling assistant. Summarise the user's day "
+        "from the following summaries of consecutive parts of their chat "
+        "transcript. Provide a short paragraph summary, followed by bullet "
+        "point highlights and an overall mood word.\n"
+        f"Date: {day.isoformat()}\n"
+        "Part summaries:\n"
+        f"{parts_text}\n"
+        "Response format:\n"
+        "Summary: <paragraph>\n"
+        "Highlights:\n- <point>\n"
+        "Mood: <single word>\n"
+    )
+
+
+def _group_partials(partials: List[str], budget: int) -> List[List[str]]:
+    """Pack consecutive partial summaries into groups of about ``budget`` tokens.
+
+    Every group holds at least two partials, so each reduction round shrinks
+    the list however long the partials are.
+    """
+
+    groups: List[List[str]] = []
+    current: List[str] = []
+    used = 0
+    for text in partials:
+        cost = estimate_tokens(text)
+        if len(current) >= 2 and used + cost > budget:
+            groups.append(current)
+            current, used = [], 0
+        current.append(text)
+        used += cost
+    if len(current) == 1 and groups:
+        groups[-1].extend(current)
+    elif current:
+        groups.append(current)
+    return groups
+
+
+def _build_reduce_prompt(day: date, part: int, parts: int, partials: List[str]) -> str:
+    parts_text = "\n".join(f"- {text}" for text in partials)
+    return (
+        "You are an empathetic journaling assistant. The following are "
+        "summaries of consecutive parts of the user's chat transcript for "
+        f"{day.isoformat()}, making up section {part} of {parts} of the day. "
+        "Combine them into one summary of a few sentences, keeping concrete "
+        "events, names and how the user felt.\n"
+        "Part summaries:\n"
+        f"{parts_text}\n"
+    )
+
+
+async def _summarise_parts(
+    username: str, digests: List[str], prompts: List[str]
+) -> Tuple[List[str], bool]:
+    """Summarise ``prompts`` concurrently, reusing cached results by digest.
+
+    Returns the summaries and whether they all came from the model.  Only
+    model output is cached; the Gemini client bounds how many run at once.
+    """
+
+    cached = await summary_cache.get_chunks(username, digests)
+
+    async def summarise(index: int) -> Tuple[str, bool]:
+        if cached[index] is not None:
+            return cached[index], True
+        return await generate_summary(prompts[index])
+
+    results = await asyncio.gather(*(summarise(index) for index in range(len(prompts))))
+    fresh = [
+        (digest, text)
+        for digest, (text, from_model), hit in zip(digests, results, cached)
+        if hit is None and from_model
+    ]
+    if fresh:
+        async with async_redis_client.pipeline(transaction=False) as pipe:
+            for digest, text in fresh:
+                summary_cache.put_chunk(pipe, username, digest, text)
+            await pipe.execute()
+    return [text for text, _ in results], all(from_model for _, from_model in results)
+
+
+async def _summary_prompt(
+    username: str, day: date, chunks: List[List[ChatMessage]]
+) -> Tuple[str, bool]:
+    """Return the prompt for the day's summary and whether it is fit to cache.
+
+    ``chunks`` comes from :func:`_chunk_messages`.  Days longer than
+    ``SUMMARY_CHUNK_TOKENS`` are summarised map-reduce style: each chunk is
+    summarised on its own, partial summaries are combined in groups until
+    they fit the budget together, and the prompt merges what is left.  A
+    prompt built from fallback partials is not fit to cache.
+    """
+
+    if len(chunks) <= 1:
+        return _build_prompt(day, chunks[0] if chunks else []), True
+    partials, from_model = await _summarise_parts(
+        username,
+        [summary_cache.compute_digest(chunk, SUMMARY_PROMPT_VERSION) for chunk in chunks],
+        [
+            _build_chunk_prompt(day, index, len(chunks), chunk)
+            for index, chunk in enumerate(chunks, 1)
+        ],
+    )
+    while len(partials) > 1 and estimate_tokens("\n".join(partials)) > SUMMARY_CHUNK_TOKENS:
+        groups = _group_partials(partials, SUMMARY_CHUNK_TOKENS)
+        partials, reduced_from_model = await _summarise_parts(
+            username,
+            [summary_cache.compute_text_digest(group, SUMMARY_PROMPT_VERSION) for group in groups],
+            [
+                _build_reduce_prompt(day, index, len(groups), group)
+                for index, group in enumerate(groups, 1)
+            ],
+        )
+        from_model = from_model and reduced_from_model
+    return _build_merge_prompt(day, partials), from_model
+
+
+def _mood_label(score: float) -> str:
     if score > 1:
         return "positive"
     if score < -1:
@@ -122,13 +524,11 @@ def _infer_mood(messages: Iterable[ChatMessage]) -> str:
     return "neutral"
 
 
-def _extract_highlights(messages: Iterable[ChatMessage], limit: int = 3) -> List[str]:
-    user_messages = [m.text for m in messages if m.role == "user"]
-    if not user_messages:
-        return []
-    # Pick the most recent distinct messages as highlights.
+def _highlights(recent_user_messages: Iterable[str], limit: int = 3) -> List[str]:
+    """Pick the most recent distinct messages (given newest first) as highlights."""
+
     highlights: List[str] = []
-    for text in reversed(user_messages):
+    for text in recent_user_messages:
         cleaned = text.strip()
         if cleaned and cleaned not in highlights:
             highlights.append(cleaned)
@@ -138,21 +538,8 @@ def _extract_highlights(messages: Iterable[ChatMessage], limit: int = 3) -> List
     return highlights
 
 
-def _extract_tags(messages: Iterable[ChatMessage], limit: int = 5) -> List[str]:
-    words: Counter[str] = Counter()
-    for message in messages:
-        if message.role != "user":
-            continue
-        for word in message.text.split():
-            cleaned = "".join(ch for ch in word.lower() if ch.isalnum())
-            if len(cleaned) >= 4:
-                words[cleaned] += 1
-    most_common = [word for word, _ in words.most_common(limit)]
-    return most_common
-
-
 @router.post("/add", response_model=ChatMessage, status_code=status.HTTP_201_CREATED)
-def add_entry(
+async def add_entry(
     payload: ChatMessageCreate, username: str = Depends(get_current_user)
 ) -> ChatMessage:
     now = datetime.now(timezone.utc)
@@ -162,57 +549,384 @@ def add_entry(
         text=payload.text,
         timestamp=now,
     )
-    _store_message(username, message)
+    await _store_message(username, message)
     return message
 
 
+@router.post("/add/batch", response_model=List[ChatMessage], status_code=status.HTTP_201_CREATED)
+async def add_entries(
+    payload: ChatMessageBatch, username: str = Depends(get_current_user)
+) -> List[ChatMessage]:
+    """Store an ordered backlog of messages in one request.
+
+    Each item carries a client-chosen ``idempotency_key``; replaying a batch
+    (or part of one) within ``IDEMPOTENCY_TTL_SECONDS`` returns the messages
+    stored the first time instead of storing them again.
+    """
+
+    return await _store_batch(username, payload.messages)
+
+
+async def _stored_day_state(username: str, day: date) -> Tuple[Optional[datetime], Set[str]]:
+    """Return the latest timestamp and the message ids already stored for ``day``."""
+
+    messages = await _load_messages(username, day)
+    latest = messages[-1].timestamp if messages else None
+    return latest, {message.message_id for message in messages}
+
+
+@router.post("/import", response_model=ImportReport)
+async def import_entries(request: Request, username: str = Depends(get_current_user)) -> ImportReport:
+    """Bulk import NDJSON messages (one ``ChatMessageImport`` per line).
+
+    The body may be gzip-compressed and must be sorted by timestamp.  Valid
+    lines are stored with their original timestamps in pipelined batches as the
+    upload is read.  Messages whose id is already stored for their day are
+    skipped as duplicates, so an import can be re-run safely; lines that are
+    out of order, either within the upload or before the messages already
+    stored for their day, are rejected.  Invalid lines are reported by line
+    number (up to ``IMPORT_MAX_ERRORS``) and skipped.
+    """
+
+    started = time.perf_counter()
+    gzipped = request.headers.get("content-encoding", "").lower() == "gzip"
+    imported = failed = duplicates = 0
+    days: Set[date] = set()
+    errors: List[ImportLineError] = []
+    # The upload is chronological, so only the current day's state is needed.
+    current_day: Optional[date] = None
+    latest: Optional[datetime] = None
+    stored_ids: Set[str] = set()
+    try:
+        async for rows, batch_errors in importer.read_batches(request.stream(), gzipped):
+            messages: List[ChatMessage] = []
+            for number, message in rows:
+                day = message.timestamp.date()
+                if day != current_day:
+                    current_day = day
+                    latest, stored_ids = await _stored_day_state(username, day)
+                if message.message_id in stored_ids:
+                    duplicates += 1
+                    continue
+                if latest is not None and message.timestamp < latest:
+                    batch_errors.append(
+                        ImportLineError(
+                            line=number, detail=f"Older than the messages already stored for {day}"
+                        )
+                    )
+                    continue
+                latest = message.timestamp
+                stored_ids.add(message.message_id)
+                messages.append(message)
+            if messages:
+                await _store_messages(username, messages)
+            imported += len(messages)
+            days.update(message.timestamp.date() for message in messages)
+            failed += len(batch_errors)
+            batch_errors.sort(key=lambda error: error.line)
+            errors.extend(batch_errors[: max(importer.IMPORT_MAX_ERRORS - len(errors), 0)])
+    except importer.ImportFormatError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{exc} after {imported} imported messages",
+        ) from exc
+
+    elapsed = time.perf_counter() - started
+    return ImportReport(
+        imported=imported,
+        failed=failed,
+        duplicates=duplicates,
+        days=len(days),
+        elapsed_seconds=round(elapsed, 3),
+        rows_per_second=round(imported / elapsed, 1) if elapsed else 0.0,
+        errors=errors,
+    )
+
+
 @router.get("/timeline", response_model=DiaryTimeline)
-def get_timeline(username: str = Depends(get_current_user)) -> DiaryTimeline:
-    pattern = f"chat:{username}:*"
-    entries: List[DiaryTimelineEntry] = []
-    for key in redis_client.scan_iter(match=pattern):
-        _, _, date_str = key.split(":", 2)
-        day = date.fromisoformat(date_str)
-        messages = _load_messages(username, day)
-        summary = _load_summary(username, day)
-        entries.append(DiaryTimelineEntry(date=day, messages=messages, summary=summary))
-    entries.sort(key=lambda entry: entry.date, reverse=True)
-    return DiaryTimeline(entries=entries)
+async def get_timeline(
+    limit: int = Query(TIMELINE_DEFAULT_LIMIT, ge=1, le=TIMELINE_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    username: str = Depends(get_current_user),
+) -> Response:
+    """Return one page of diary days, newest first.
+
+    Pass the returned ``next_cursor`` back as ``cursor`` to fetch the following
+    page.  ``start_date`` and ``end_date`` bound the page inclusively.
+    """
+
+    start = _parse_date_param(start_date, "start_date")
+    end = _parse_date_param(end_date, "end_date")
+    before = _parse_date_param(decode_cursor(cursor, 1)[0], "cursor") if cursor else None
+
+    days, has_more = await _page_days(username, limit, start=start, end=end, before=before)
+    entries = await _load_timeline_json(username, days)
+    next_cursor = encode_cursor(days[-1].isoformat()) if has_more else None
+    return Response(content=timeline_body(entries, next_cursor), media_type="application/json")
+
+
+@router.get("/timeline/stream", response_class=StreamingResponse)
+async def stream_timeline(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    username: str = Depends(get_current_user),
+) -> StreamingResponse:
+    """Stream every diary day as NDJSON (one ``DiaryTimelineEntry`` per line)."""
+
+    start = _parse_date_param(start_date, "start_date")
+    end = _parse_date_param(end_date, "end_date")
+    return StreamingResponse(_stream_timeline(username, start, end), media_type="application/x-ndjson")
+
+
+@router.get("/messages/{entry_date}", response_model=DiaryMessagePage)
+async def get_day_messages(
+    entry_date: str,
+    limit: int = Query(MESSAGES_PAGE_DEFAULT, ge=1, le=MESSAGES_PAGE_MAX),
+    cursor: Optional[str] = None,
+    username: str = Depends(get_current_user),
+) -> Response:
+    """Return one page of a day's messages, oldest first."""
+
+    day = _parse_date_param(entry_date, "date")
+    offset = 0
+    if cursor:
+        value = decode_cursor(cursor, 1)[0]
+        if not value.isdigit():
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        offset = int(value)
+
+    raw_messages, total_count = await _load_message_range(username, day, offset, limit)
+    messages: List[bytes] = []
+    for raw in raw_messages:
+        try:
+            messages.append(message_json(raw))
+        except Exception:  # pragma: no cover - defensive against bad data
+            continue
+    next_offset = offset + len(raw_messages)
+    next_cursor = encode_cursor(str(next_offset)) if next_offset < total_count else None
+    body = b"".join(
+        (
+            b'{"date":"',
+            day.isoformat().encode(),
+            b'","messages":',
+            json_array(messages),
+            b',"next_cursor":',
+            orjson.dumps(next_cursor),
+            b"}",
+        )
+    )
+    return Response(content=body, media_type="application/json")
 
 
 @router.get("/list", response_model=List[DiarySummary])
-def get_list(username: str = Depends(get_current_user)) -> List[DiarySummary]:
-    summaries: List[DiarySummary] = []
-    pattern = f"summary:{username}:*"
-    for key in redis_client.scan_iter(match=pattern):
-        day = date.fromisoformat(key.split(":", 2)[2])
-        summary = _load_summary(username, day)
-        if summary:
-            summaries.append(summary)
-    summaries.sort(key=lambda item: item.date, reverse=True)
-    return summaries
-
-
-@router.post("/generate/{entry_date}", response_model=DiarySummary)
-def generate_daily_summary(entry_date: str, username: str = Depends(get_current_user)) -> DiarySummary:
+async def get_list(username: str = Depends(get_current_user)) -> Response:
+    days = await _list_days(username)
+    raw_summaries = (
+        await async_redis_binary_client.mget([_summary_key(username, day) for day in days])
+        if days
+        else []
+    )
+    body = json_array(raw for raw in raw_summaries if raw)
+    return Response(content=body, media_type="application/json")
+
+
+async def _fresh_cached_summary(username: str, day: date) -> Optional[DiarySummary]:
+    """Return the cached summary if the day is unchanged since it was generated."""
+
+    fresh_digest = await summary_cache.current_digest(
+        username, day, _chat_key(username, day), SUMMARY_PROMPT_VERSION
+    )
+    if fresh_digest:
+        cached = await summary_cache.get(username, fresh_digest)
+        if cached:
+            await summary_cache.record_lookup(hit=True)
+            return cached
+    return None
+
+
+async def _cached_for_messages(
+    username: str, messages: List[ChatMessage]
+) -> Tuple[str, Optional[DiarySummary]]:
+    """Return the messages' digest and, on a cache hit, the stored summary."""
+
+    digest = summary_cache.compute_digest(messages, SUMMARY_PROMPT_VERSION)
+    cached = await summary_cache.get(username, digest)
+    await summary_cache.record_lookup(hit=cached is not None)
+    if cached:
+        await _store_summary(username, cached, digest, len(messages))
+    return digest, cached
+
+
+async def _load_day(username: str, day: date) -> Tuple[List[ChatMessage], features.DayAggregate]:
+    """Load the day's messages together with its running aggregates.
+
+    Both are read before generation starts, so messages appended while Gemini
+    is working do not leak into the mood, highlights or tags.
+    """
+
+    messages, aggregate = await asyncio.gather(
+        _load_messages(username, day), features.day_aggregate(username, day)
+    )
+    return messages, aggregate
+
+
+async def _finish_summary(
+    username: str,
+    day: date,
+    summary_text: str,
+    aggregate: features.DayAggregate,
+    digest: Optional[str],
+    message_count: int,
+) -> DiarySummary:
+    """Store the summary; pass ``digest=None`` for fallback text so it is not cached."""
+
+    diary_summary = DiarySummary(
+        date=day,
+        summary=summary_text,
+        mood=_mood_label(aggregate.mood_score),
+        highlights=_highlights(aggregate.recent_user_messages),
+        tags=aggregate.top_tags,
+    )
+    await _store_summary(username, diary_summary, digest, message_count)
+    return diary_summary
+
+
+async def summarize_day(username: str, day: date) -> Optional[DiarySummary]:
+    """Generate, store and return the summary for ``day``.
+
+    Returns ``None`` when the user has no messages for that day.
+    """
+
+    # Unchanged since the last summary: answer without reloading the messages.
+    cached = await _fresh_cached_summary(username, day)
+    if cached:
+        return cached
+
+    messages, aggregate = await _load_day(username, day)
+    if not messages:
+        return None
+
+    digest, cached = await _cached_for_messages(username, messages)
+    if cached:
+        return cached
+
+    chunks = _chunk_messages(messages, SUMMARY_CHUNK_TOKENS)
+    prompt, from_model = await _summary_prompt(username, day, chunks)
+    summary_text, summary_from_model = await generate_summary(prompt)
+    from_model = from_model and summary_from_model
+    # Fallback text is stored for display but never cached, so the next
+    # request retries Gemini.
+    return await _finish_summary(
+        username, day, summary_text, aggregate, digest if from_model else None, len(messages)
+    )
+
+
+def _sse(event: str, data: bytes) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + data + b"\n\n"
+
+
+async def _summary_events(
+    username: str,
+    day: date,
+    messages: List[ChatMessage],
+    aggregate: features.DayAggregate,
+    digest: str,
+) -> AsyncIterator[bytes]:
+    """Forward summary text as ``delta`` events, then store and send the summary.
+
+    Long days first send a ``progress`` event, since summarising their chunks
+    happens before any text can be streamed.
+    """
+
+    parts: List[str] = []
+    chunks = _chunk_messages(messages, SUMMARY_CHUNK_TOKENS)
+    if len(chunks) > 1:
+        yield _sse("progress", orjson.dumps({"stage": "chunks", "chunks": len(chunks)}))
+    prompt, from_model = await _summary_prompt(username, day, chunks)
+    try:
+        async for text, chunk_from_model in stream_summary(prompt):
+            parts.append(text)
+            from_model = from_model and chunk_from_model
+            yield _sse("delta", orjson.dumps({"text": text}))
+    except GeminiClientError:
+        yield _sse("error", orjson.dumps({"detail": "Summary generation was interrupted"}))
+        return
+    diary_summary = await _finish_summary(
+        username,
+        day,
+        "".join(parts).strip(),
+        aggregate,
+        digest if from_model else None,
+        len(messages),
+    )
+    yield _sse("summary", diary_summary.json().encode())
+
+
+async def _cached_summary_events(diary_summary: DiarySummary) -> AsyncIterator[bytes]:
+    yield _sse("summary", diary_summary.json().encode())
+
+
+@router.post("/generate/{entry_date}", response_model=Union[DiarySummary, SummaryJob])
+async def generate_daily_summary(
+    entry_date: str,
+    response: Response,
+    background: bool = False,
+    username: str = Depends(get_current_user),
+) -> Union[DiarySummary, SummaryJob]:
+    """Summarise a day, or with ``background=true`` queue it and return the job."""
+
     try:
         day = date.fromisoformat(entry_date)
     except ValueError as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid date format") from exc
 
-    messages = _load_messages(username, day)
-    if not messages:
+    if background:
+        response.status_code = status.HTTP_202_ACCEPTED
+        return await jobs.enqueue_summary(username, day)
+
+    diary_summary = await summarize_day(username, day)
+    if diary_summary is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No chat history for the requested date")
+    return diary_summary
 
-    prompt = _build_prompt(day, messages)
-    summary_text = generate_summary(prompt)
 
-    diary_summary = DiarySummary(
-        date=day,
-        summary=summary_text,
-        mood=_infer_mood(messages),
-        highlights=_extract_highlights(messages),
-        tags=_extract_tags(messages),
+@router.get("/generate/{entry_date}/stream", response_class=StreamingResponse)
+async def stream_daily_summary(
+    entry_date: str, username: str = Depends(get_current_user)
+) -> StreamingResponse:
+    """Summarise a day over server-sent events.
+
+    ``delta`` events carry partial summary text as it is generated and a final
+    ``summary`` event carries the stored ``DiarySummary``.  An unchanged day is
+    answered with the cached summary alone; an ``error`` event means
+    generation failed partway and nothing was stored.
+    """
+
+    day = _parse_date_param(entry_date, "date")
+    cached = await _fresh_cached_summary(username, day)
+    if cached:
+        events = _cached_summary_events(cached)
+    else:
+        messages, aggregate = await _load_day(username, day)
+        if not messages:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No chat history for the requested date")
+        digest, cached = await _cached_for_messages(username, messages)
+        if cached:
+            events = _cached_summary_events(cached)
+        else:
+            events = _summary_events(username, day, messages, aggregate, digest)
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
-    _store_summary(username, diary_summary)
-    return diary_summary
+
+
+@router.get("/jobs/{job_id}", response_model=SummaryJob)
+async def get_summary_job(job_id: str, username: str = Depends(get_current_user)) -> SummaryJob:
+    job = await jobs.get_job(job_id, username)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
@@ -0,0 +1,134 @@
+"""Full-history exports as gzip-compressed NDJSON.
+
+Each line is one diary day in the ``DiaryTimelineEntry`` layout (date,
+messages and summary), newest first.  Days are read from Redis a batch at a
+time and compressed as they are produced, so an export uses constant memory
+however long the history is.
+
+``GET /diary/export`` streams the authenticated user's archive.  For backups,
+``python -m app.export --out DIR [--concurrency N] [USERNAME ...]`` writes
+``DIR/{username}.ndjson.gz`` for the given users, or for every user when none
+are named, exporting ``N`` users at a time.  Usernames are percent-encoded in
+file names and download headers, so no name can contain a path separator or
+escape ``DIR``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import re
+import time
+import zlib
+from typing import AsyncIterator, List, Optional
+from urllib.parse import quote
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+
+from app import counters
+from app.auth import get_current_user
+from app.diary import _stream_timeline
+from app.redis_client import async_redis_client, check_async_connection, close_async_client
+
+router = APIRouter(prefix="/diary", tags=["diary"])
+
+EXPORT_COMPRESS_LEVEL = int(os.getenv("EXPORT_COMPRESS_LEVEL", 6))
+EXPORT_SUFFIX = ".ndjson.gz"
+
+_UNSAFE_FILENAME = re.compile(r"[^A-Za-z0-9._-]")
+
+
+def archive_name(username: str) -> str:
+    """Return a file name for ``username``'s archive without path separators.
+
+    Percent-encoding keeps distinct usernames distinct; a leading dot is
+    encoded too so ``.`` and ``..`` cannot name a directory.
+    """
+
+    name = quote(username, safe="")
+    if name.startswith("."):
+        name = "%2E" + name[1:]
+    return name + EXPORT_SUFFIX
+
+
+def _content_disposition(username: str) -> str:
+    fallback = _UNSAFE_FILENAME.sub("_", f"diary-{username}") + EXPORT_SUFFIX
+    encoded = quote(f"diary-{username}{EXPORT_SUFFIX}", safe="")
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{encoded}"
+
+
+async def gzip_stream(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Compress ``chunks`` into a single gzip member as they arrive."""
+
+    compressor = zlib.compressobj(EXPORT_COMPRESS_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_stream(username: str) -> AsyncIterator[bytes]:
+    return gzip_stream(_stream_timeline(username, None, None))
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_history(username: str = Depends(get_current_user)) -> StreamingResponse:
+    """Download every diary day with its messages and summary as ``.ndjson.gz``."""
+
+    return StreamingResponse(
+        export_stream(username),
+        media_type="application/gzip",
+        headers={"Content-Disposition": _content_disposition(username)},
+    )
+
+
+async def _export_user(username: str, out_dir: str, slots: asyncio.Semaphore) -> int:
+    path = os.path.join(out_dir, archive_name(username))
+    if os.path.dirname(os.path.abspath(path)) != os.path.abspath(out_dir):
+        raise ValueError(f"Refusing to export {username!r} outside {out_dir}")
+    partial = path + ".partial"
+    written = 0
+    async with slots:
+        with open(partial, "wb") as handle:
+            async for chunk in export_stream(username):
+                handle.write(chunk)
+                written += len(chunk)
+        # Only complete archives get the final name.
+        os.replace(partial, path)
+    return written
+
+
+async def run(usernames: List[str], out_dir: str, concurrency: int) -> None:
+    await check_async_connection()
+    os.makedirs(out_dir, exist_ok=True)
+    started = time.perf_counter()
+    try:
+        if not usernames:
+            usernames = await async_redis_client.zrange(counters.USERS_INDEX_KEY, 0, -1)
+        slots = asyncio.Semaphore(concurrency)
+        sizes = await asyncio.gather(*(_export_user(user, out_dir, slots) for user in usernames))
+    finally:
+        await close_async_client()
+    elapsed = time.perf_counter() - started
+    print(f"Exported {len(usernames)} users ({sum(sizes)} bytes) to {out_dir} in {elapsed:.1f}s.")
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.export", description=__doc__)
+    parser.add_argument("usernames", nargs="*", help="Users to export (default: all users).")
+    parser.add_argument("--out", required=True, help="Directory for the archives.")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=int(os.getenv("EXPORT_CONCURRENCY", 8)),
+        help="Maximum number of users exported at the same time.",
+    )
+    args = parser.parse_args(argv)
+    asyncio.run(run(args.usernames, args.out, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Compact per-day numeric features maintained as messages are written.
+
+Each feature is one hash per user, ``features:{username}:{name}``, keyed by
+ISO day, so loading any feature for a user's whole history is a single
+``HGETALL`` and analytics never need to re-parse messages or summaries.
+
+Features
+--------
+messages
+    Number of stored messages (user and assistant).
+user_messages
+    Number of messages written by the user.
+words
+    Number of word tokens in the user's messages.
+mood
+    Sum of the mood lexicon scores of the user's messages.
+
+Alongside them each day keeps a running aggregate of tag candidates
+(``daytags:{username}:{day}``, a sorted set of word counts) and the most recent
+user messages (``dayrecent:{username}:{day}``, newest first, capped at
+``RECENT_MESSAGES``).  All of it is updated in the transaction that stores a
+message, so :func:`day_aggregate` can produce a summary's mood, highlights and
+tags in one round trip without loading the message list.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, Iterable, List
+
+from app.lexicon import mood_lexicon
+from app.models import ChatMessage
+from app.redis_client import async_redis_client
+from app.search_index import tokenize
+
+FEATURES = ("messages", "user_messages", "words", "mood")
+RECENT_MESSAGES = 10
+TAG_MIN_LENGTH = 4
+
+
+@dataclass
+class DayAggregate:
+    """Running totals for one day, enough to fill a summary's heuristic fields."""
+
+    mood_score: float
+    messages: int
+    recent_user_messages: List[str]
+    top_tags: List[str]
+
+
+def _feature_key(username: str, name: str) -> str:
+    return f"features:{username}:{name}"
+
+
+def _tags_key(username: str, day: str) -> str:
+    return f"daytags:{username}:{day}"
+
+
+def _recent_key(username: str, day: str) -> str:
+    return f"dayrecent:{username}:{day}"
+
+
+def tag_words(text: str) -> List[str]:
+    """Lower-cased alphanumeric words long enough to be tag candidates."""
+
+    words = ("".join(ch for ch in word.lower() if ch.isalnum()) for word in text.split())
+    return [word for word in words if len(word) >= TAG_MIN_LENGTH]
+
+
+def record_messages(pipe, username: str, messages: Iterable[ChatMessage]) -> None:
+    """Queue the feature increments for ``messages`` on ``pipe``."""
+
+    totals: Dict[str, Counter] = {name: Counter() for name in FEATURES}
+    tags: Dict[str, Counter] = {}
+    recent: Dict[str, List[str]] = {}
+    for message in messages:
+        day = message.timestamp.date().isoformat()
+        totals["messages"][day] += 1
+        if message.role == "user":
+            totals["user_messages"][day] += 1
+            totals["words"][day] += len(tokenize(message.text))
+            totals["mood"][day] += mood_lexicon().score([message.text])
+            tags.setdefault(day, Counter()).update(tag_words(message.text))
+            recent.setdefault(day, []).append(message.text)
+
+    for name, per_day in totals.items():
+        for day, amount in per_day.items():
+            if name == "mood":
+                pipe.hincrbyfloat(_feature_key(username, name), day, amount)
+            else:
+                pipe.hincrby(_feature_key(username, name), day, int(amount))
+    for day, counts in tags.items():
+        for word, count in counts.items():
+            pipe.zincrby(_tags_key(username, day), count, word)
+    for day, texts in recent.items():
+        pipe.lpush(_recent_key(username, day), *texts[-RECENT_MESSAGES:])
+        pipe.ltrim(_recent_key(username, day), 0, RECENT_MESSAGES - 1)
+
+
+def reset_user(pipe, username: str) -> None:
+    """Queue dropping every per-day feature of the user, e.g. before a rebuild."""
+
+    pipe.delete(*(_feature_key(username, name) for name in FEATURES))
+
+
+def reset_day(pipe, username: str, day: date) -> None:
+    """Queue dropping the day's running tag and recent-message aggregates."""
+
+    pipe.delete(_tags_key(username, day.isoformat()), _recent_key(username, day.isoformat()))
+
+
+async def load(username: str) -> Dict[str, Dict[date, float]]:
+    """Return every feature for the user as ``{name: {day: value}}``."""
+
+    async with async_redis_client.pipeline(transaction=False) as pipe:
+        for name in FEATURES:
+            pipe.hgetall(_feature_key(username, name))
+        results: List[Dict[str, str]] = await pipe.execute()
+    return {
+        name: {date.fromisoformat(day): float(value) for day, value in raw.items()}
+        for name, raw in zip(FEATURES, results)
+    }
+
+
+async def day_aggregate(username: str, day: date, tag_limit: int = 5) -> DayAggregate:
+    field = day.isoformat()
+    async with async_redis_client.pipeline(transaction=False) as pipe:
+        pipe.hget(_feature_key(username, "mood"), field)
+        pipe.hget(_feature_key(username, "messages"), field)
+        pipe.lrange(_recent_key(username, field), 0, -1)
+        pipe.zrevrange(_tags_key(username, field), 0, tag_limit - 1)
+        mood, messages, recent, top_tags = await pipe.execute()
+    return DayAggregate(
+        mood_score=float(mood or 0.0),
+        messages=int(messages or 0),
+        recent_user_messages=recent,
+        top_tags=top_tags,
+    )
+
+
+__all__ = [
+    "FEATURES",
+    "DayAggregate",
+    "tag_words",
+    "record_messages",
+    "reset_user",
+    "reset_day",
+    "load",
+    "day_aggregate",
+]
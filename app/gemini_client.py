@@ -1,55 +1,412 @@
-"""Utilities for interacting with the Gemini Generative AI API."""
+"""Utilities for interacting with the Gemini Generative AI API.
+
+All calls share one keep-alive connection pool.  Rate limiting (429) and server
+errors are retried a bounded number of times with jittered exponential
+backoff, and a circuit breaker stops calling the API for a cool-down period
+after repeated failures so callers fall back to the local summariser
+immediately instead of waiting on a degraded upstream.  The endpoint is read
+from ``GEMINI_API_URL`` so the client can be pointed at a local stub server.
+At most ``GEMINI_MAX_CONCURRENCY`` requests are in flight per process,
+however many callers (requests, chunked summaries, runners) share it.
+
+:func:`stream_summary` uses the ``streamGenerateContent`` endpoint
+(``GEMINI_STREAM_URL``, derived from ``GEMINI_API_URL`` by default) over
+server-sent events and yields text as the model produces it.
+"""
 
 from __future__ import annotations
 
+import asyncio
+import json
 import os
+import random
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, Optional, Tuple, Union
 
-import requests
+import httpx
 from dotenv import load_dotenv
 
 load_dotenv()
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-GEMINI_API_URL = (
-    "https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:generateContent"
+GEMINI_API_URL = os.getenv(
+    "GEMINI_API_URL",
+    "https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:generateContent",
+)
+GEMINI_STREAM_URL = os.getenv(
+    "GEMINI_STREAM_URL", GEMINI_API_URL.replace(":generateContent", ":streamGenerateContent")
 )
-REQUEST_TIMEOUT_SECONDS = 30
+REQUEST_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", 30))
+GEMINI_MAX_CONNECTIONS = int(os.getenv("GEMINI_MAX_CONNECTIONS", 20))
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", GEMINI_MAX_CONNECTIONS))
+GEMINI_KEEPALIVE_SECONDS = float(os.getenv("GEMINI_KEEPALIVE_SECONDS", 60))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", 2))
+GEMINI_BACKOFF_BASE_SECONDS = float(os.getenv("GEMINI_BACKOFF_BASE_SECONDS", 0.5))
+GEMINI_BACKOFF_CAP_SECONDS = float(os.getenv("GEMINI_BACKOFF_CAP_SECONDS", 8))
+GEMINI_BREAKER_THRESHOLD = int(os.getenv("GEMINI_BREAKER_THRESHOLD", 5))
+GEMINI_BREAKER_RESET_SECONDS = float(os.getenv("GEMINI_BREAKER_RESET_SECONDS", 30))
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+# Words per chunk when streaming the local fallback summary.
+FALLBACK_STREAM_WORDS = 8
+
+_http_client: Optional[httpx.AsyncClient] = None
+_call_slots: Optional[asyncio.Semaphore] = None
+_call_slots_loop: Optional[asyncio.AbstractEventLoop] = None
 
 
 class GeminiClientError(RuntimeError):
     """Base exception for Gemini client errors."""
 
 
-def _call_gemini(prompt: str) -> str:
+class CircuitOpenError(GeminiClientError):
+    """Raised without calling the API while the circuit breaker is open."""
+
+
+class GeminiRequestError(GeminiClientError):
+    """Raised when Gemini rejects the request itself (a 4xx other than 429)."""
+
+
+@dataclass
+class CircuitBreaker:
+    """Opens after ``threshold`` consecutive failures for ``reset_seconds``.
+
+    Once the cool-down elapses a single trial call is let through (half-open);
+    its success closes the breaker and its failure re-opens it.
+    """
+
+    threshold: int
+    reset_seconds: float
+    failures: int = 0
+    opened_at: Optional[float] = None
+    trial_in_flight: bool = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def release_trial(self) -> None:
+        """Free the half-open trial slot of a call that ended without an outcome."""
+
+        self.trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+
+@dataclass
+class CallMetrics:
+    """Per-outcome call counts and latency totals."""
+
+    outcomes: Dict[str, int] = field(default_factory=dict)
+    retries: int = 0
+    total_latency_seconds: float = 0.0
+    max_latency_seconds: float = 0.0
+
+    def record(self, outcome: str, latency: float) -> None:
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+        self.total_latency_seconds += latency
+        self.max_latency_seconds = max(self.max_latency_seconds, latency)
+
+    def snapshot(self) -> Dict[str, Union[int, float, str, Dict[str, int]]]:
+        calls = sum(self.outcomes.values())
+        return {
+            "calls": calls,
+            "outcomes": dict(self.outcomes),
+            "retries": self.retries,
+            "avg_latency_ms": self.total_latency_seconds / calls * 1000 if calls else 0.0,
+            "max_latency_ms": self.max_latency_seconds * 1000,
+            "circuit": _breaker.state,
+        }
+
+
+_breaker = CircuitBreaker(GEMINI_BREAKER_THRESHOLD, GEMINI_BREAKER_RESET_SECONDS)
+_metrics = CallMetrics()
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    """Return the shared HTTP client, creating it on first use."""
+
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=REQUEST_TIMEOUT_SECONDS,
+            limits=httpx.Limits(
+                max_connections=GEMINI_MAX_CONNECTIONS,
+                max_keepalive_connections=GEMINI_MAX_CONNECTIONS,
+                keepalive_expiry=GEMINI_KEEPALIVE_SECONDS,
+            ),
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Close the shared HTTP client and its pooled connections."""
+
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def _gemini_slots() -> asyncio.Semaphore:
+    """Return the process-wide limiter on in-flight Gemini requests."""
+
+    global _call_slots, _call_slots_loop
+    loop = asyncio.get_running_loop()
+    if _call_slots is None or _call_slots_loop is not loop:
+        _call_slots = asyncio.Semaphore(GEMINI_MAX_CONCURRENCY)
+        _call_slots_loop = loop
+    return _call_slots
+
+
+def set_max_concurrency(limit: int) -> None:
+    """Cap in-flight Gemini requests at ``limit``; call before any request."""
+
+    global GEMINI_MAX_CONCURRENCY, _call_slots
+    GEMINI_MAX_CONCURRENCY = limit
+    _call_slots = None
+
+
+def gemini_metrics() -> Dict[str, Union[int, float, str, Dict[str, int]]]:
+    """Return call counts, latency and circuit state for monitoring."""
+
+    return _metrics.snapshot()
+
+
+def _backoff_delay(attempt: int, response: Optional[httpx.Response]) -> float:
+    if response is not None:
+        retry_after = response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return min(float(retry_after), GEMINI_BACKOFF_CAP_SECONDS)
+    # Full jitter keeps concurrent retries from synchronising.
+    ceiling = min(GEMINI_BACKOFF_CAP_SECONDS, GEMINI_BACKOFF_BASE_SECONDS * 2**attempt)
+    return random.uniform(0, ceiling)
+
+
+async def _post_with_retries(body: dict, params: dict) -> httpx.Response:
+    client = _get_http_client()
+    for attempt in range(GEMINI_MAX_RETRIES + 1):
+        response: Optional[httpx.Response] = None
+        try:
+            response = await client.post(GEMINI_API_URL, params=params, json=body)
+            if response.status_code not in RETRYABLE_STATUS_CODES:
+                response.raise_for_status()
+                return response
+            error: httpx.HTTPError = httpx.HTTPStatusError(
+                f"Gemini API returned {response.status_code}",
+                request=response.request,
+                response=response,
+            )
+        except httpx.TransportError as exc:
+            error = exc
+        if attempt == GEMINI_MAX_RETRIES:
+            raise error
+        _metrics.retries += 1
+        await asyncio.sleep(_backoff_delay(attempt, response))
+    raise AssertionError("unreachable")  # pragma: no cover
+
+
+def _is_upstream_failure(exc: httpx.HTTPError) -> bool:
+    """Transport errors, 429 and 5xx count against the breaker; other 4xx do not."""
+
+    if isinstance(exc, httpx.HTTPStatusError):
+        code = exc.response.status_code
+        return code in RETRYABLE_STATUS_CODES or code >= 500
+    return True
+
+
+async def _call_gemini(prompt: str) -> str:
     if not GEMINI_API_KEY:
         raise GeminiClientError(
             "GEMINI_API_KEY is not configured; unable to call Gemini API."
         )
+    if not _breaker.allow():
+        _metrics.record("short_circuited", 0.0)
+        raise CircuitOpenError("Gemini circuit breaker is open")
 
     body = {"contents": [{"parts": [{"text": prompt}]}]}
     params = {"key": GEMINI_API_KEY}
 
+    started = time.perf_counter()
+    finished = False
     try:
-        response = requests.post(
-            GEMINI_API_URL,
-            params=params,
-            json=body,
-            timeout=REQUEST_TIMEOUT_SECONDS,
-        )
-        response.raise_for_status()
-    except requests.RequestException as exc:  # pragma: no cover - network guard
+        async with _gemini_slots():
+            response = await _post_with_retries(body, params)
+        payload = response.json()
+        text = payload["candidates"][0]["content"]["parts"][0]["text"].strip()
+        finished = True
+    except httpx.HTTPError as exc:
+        finished = True
+        if not _is_upstream_failure(exc):
+            # One bad or oversized prompt must not open the circuit for everyone.
+            _breaker.record_success()
+            _metrics.record("rejected", time.perf_counter() - started)
+            raise GeminiRequestError(f"Gemini API rejected the request: {exc}") from exc
+        _breaker.record_failure()
+        _metrics.record("error", time.perf_counter() - started)
         raise GeminiClientError("Failed to communicate with Gemini API") from exc
+    except (KeyError, IndexError, ValueError) as exc:
+        finished = True
+        # The API answered, so the upstream is healthy even if the payload is odd.
+        _breaker.record_success()
+        _metrics.record("bad_response", time.perf_counter() - started)
+        raise GeminiClientError("Unexpected Gemini API response structure") from exc
+    finally:
+        if not finished:
+            # Cancelled (e.g. the client disconnected); free a half-open trial slot.
+            _breaker.release_trial()
+
+    _breaker.record_success()
+    _metrics.record("success", time.perf_counter() - started)
+    return text
+
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four characters per token for English prose.
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text: str, tokens: int) -> str:
+    """Cut ``text`` so that :func:`estimate_tokens` is at most ``tokens``."""
+
+    return text[: max(tokens, 1) * CHARS_PER_TOKEN]
+
+
+def _fallback_summary(prompt: str) -> str:
+    # Provide a deterministic fallback so the app continues to function in
+    # development or when the API is unreachable.
+    snippet = prompt.strip().splitlines()
+    snippet = " ".join(snippet[-5:]).strip()
+    if not snippet:
+        return "No content available to summarise."
+    # Return the last few lines, truncated to a readable length.
+    return snippet[:500]
+
+
+def _chunk_text(payload: dict) -> str:
+    """Return a stream chunk's text; finish-only and usage-only chunks have none."""
+
+    candidates = payload.get("candidates") or [{}]
+    parts = candidates[0].get("content", {}).get("parts", [])
+    return "".join(part.get("text", "") for part in parts)
+
 
+async def _stream_gemini(prompt: str) -> AsyncIterator[str]:
+    """Yield text chunks from Gemini's streaming endpoint.
+
+    Partial output cannot be replayed, so unlike :func:`_call_gemini` the
+    request is not retried; callers fall back instead.
+    """
+
+    if not GEMINI_API_KEY:
+        raise GeminiClientError(
+            "GEMINI_API_KEY is not configured; unable to call Gemini API."
+        )
+    if not _breaker.allow():
+        _metrics.record("short_circuited", 0.0)
+        raise CircuitOpenError("Gemini circuit breaker is open")
+
+    body = {"contents": [{"parts": [{"text": prompt}]}]}
+    params = {"key": GEMINI_API_KEY, "alt": "sse"}
+
+    started = time.perf_counter()
+    finished = False
     try:
-        payload = response.json()
-        return payload["candidates"][0]["content"]["parts"][0]["text"].strip()
+        async with _gemini_slots(), _get_http_client().stream(
+            "POST", GEMINI_STREAM_URL, params=params, json=body
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                text = _chunk_text(json.loads(line[len("data:"):]))
+                if text:
+                    yield text
+        finished = True
+    except httpx.HTTPError as exc:
+        finished = True
+        if not _is_upstream_failure(exc):
+            _breaker.record_success()
+            _metrics.record("rejected", time.perf_counter() - started)
+            raise GeminiRequestError(f"Gemini API rejected the request: {exc}") from exc
+        _breaker.record_failure()
+        _metrics.record("error", time.perf_counter() - started)
+        raise GeminiClientError("Failed to stream from Gemini API") from exc
     except (KeyError, IndexError, ValueError) as exc:
-        raise GeminiClientError("Unexpected Gemini API response structure") from exc
+        finished = True
+        _breaker.record_success()
+        _metrics.record("bad_response", time.perf_counter() - started)
+        raise GeminiClientError("Unexpected Gemini API stream structure") from exc
+    finally:
+        if not finished:
+            # The consumer went away mid-stream; free a half-open trial slot.
+            _breaker.release_trial()
 
+    _breaker.record_success()
+    _metrics.record("success", time.perf_counter() - started)
 
-def generate_summary(prompt: str) -> str:
+
+async def _fallback_stream(prompt: str) -> AsyncIterator[str]:
+    words = _fallback_summary(prompt).split(" ")
+    for start in range(0, len(words), FALLBACK_STREAM_WORDS):
+        chunk = " ".join(words[start : start + FALLBACK_STREAM_WORDS])
+        yield chunk if start + FALLBACK_STREAM_WORDS >= len(words) else chunk + " "
+        await asyncio.sleep(0)
+
+
+async def stream_summary(prompt: str) -> AsyncIterator[Tuple[str, bool]]:
+    """Stream a summary from Gemini, or from the local summariser if it is unavailable.
+
+    Yields ``(text, from_model)`` pairs; concatenating the texts gives the
+    full summary and ``from_model`` is ``False`` for fallback text.  If Gemini
+    fails after text has already been streamed, :class:`GeminiClientError` is
+    raised rather than switching sources halfway through.
+    """
+
+    streamed = False
+    try:
+        async for text in _stream_gemini(prompt):
+            streamed = True
+            yield text, True
+    except GeminiClientError:
+        if streamed:
+            raise
+        async for text in _fallback_stream(prompt):
+            yield text, False
+
+
+async def generate_summary(prompt: str) -> Tuple[str, bool]:
     """Generate a summary from Gemini or fall back to a basic heuristic.
 
+    Returns ``(text, from_model)``; ``from_model`` is ``False`` when the text
+    is the local fallback, which callers must not cache.
+
     Parameters
     ----------
     prompt:
@@ -57,13 +414,6 @@ def generate_summary(prompt: str) -> str:
     """
 
     try:
-        return _call_gemini(prompt)
+        return await _call_gemini(prompt), True
     except GeminiClientError:
-        # Provide a deterministic fallback so the app continues to function in
-        # development or when the API is unreachable.
-        snippet = prompt.strip().splitlines()
-        snippet = " ".join(snippet[-5:]).strip()
-        if not snippet:
-            return "No content available to summarise."
-        # Return the last few lines, truncated to a readable length.
-        return snippet[:500]
+        return _fallback_summary(prompt), False
@@ -0,0 +1,125 @@
+"""Streaming NDJSON parsing for bulk diary imports.
+
+The request body is read chunk by chunk (transparently gunzipped when it is
+gzip-compressed), split into lines and validated in batches of
+``IMPORT_BATCH_SIZE`` messages, so an import of any size is held in memory one
+batch at a time.  Each line is a :class:`ChatMessageImport` object; naive
+timestamps are taken to be UTC.
+
+Day lists are kept in chronological order by appending only, so the upload
+must be sorted by timestamp: a line older than the line before it is
+rejected.  Lines without a ``message_id`` get one derived from their
+timestamp, role and text, which lets re-running an import recognise the
+messages it already stored.
+"""
+
+from __future__ import annotations
+
+import os
+import uuid
+import zlib
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from app.models import ChatMessage, ChatMessageImport, ImportLineError
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", 1000))
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", 100))
+
+IMPORT_ID_NAMESPACE = uuid.UUID("6f1d2c4e-8b0a-4f3e-9c59-3a7de1b8a2c4")
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+class ImportFormatError(ValueError):
+    """Raised when the upload cannot be decompressed."""
+
+
+async def _decompressed(chunks: AsyncIterator[bytes], gzipped: bool) -> AsyncIterator[bytes]:
+    decompressor = None
+    first = True
+    try:
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            if first:
+                first = False
+                if gzipped or chunk.startswith(GZIP_MAGIC):
+                    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            yield decompressor.decompress(chunk) if decompressor else chunk
+        if decompressor:
+            yield decompressor.flush()
+    except zlib.error as exc:
+        raise ImportFormatError("Invalid gzip data") from exc
+
+
+async def _lines(chunks: AsyncIterator[bytes], gzipped: bool) -> AsyncIterator[Tuple[int, bytes]]:
+    """Yield ``(line number, line)`` for every non-blank line."""
+
+    buffer = b""
+    number = 0
+    async for data in _decompressed(chunks, gzipped):
+        buffer += data
+        *complete, buffer = buffer.split(b"\n")
+        for line in complete:
+            number += 1
+            if line.strip():
+                yield number, line
+    if buffer.strip():
+        yield number + 1, buffer
+
+
+def parse_line(line: bytes) -> ChatMessage:
+    item = ChatMessageImport.parse_raw(line)
+    timestamp = item.timestamp
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    timestamp = timestamp.astimezone(timezone.utc)
+    message_id = item.message_id or str(
+        uuid.uuid5(IMPORT_ID_NAMESPACE, f"{timestamp.isoformat()}|{item.role}|{item.text}")
+    )
+    return ChatMessage(message_id=message_id, role=item.role, text=item.text, timestamp=timestamp)
+
+
+async def read_batches(
+    chunks: AsyncIterator[bytes], gzipped: bool = False
+) -> AsyncIterator[Tuple[List[Tuple[int, ChatMessage]], List[ImportLineError]]]:
+    """Yield the ``(line number, message)`` rows and the errors of each batch.
+
+    Rows come out in upload order, which is chronological: a line older than
+    the previous valid line is reported as an error instead.
+    """
+
+    rows: List[Tuple[int, ChatMessage]] = []
+    errors: List[ImportLineError] = []
+    latest: Optional[datetime] = None
+    async for number, line in _lines(chunks, gzipped):
+        try:
+            message = parse_line(line)
+        except ValidationError as exc:
+            detail = "; ".join(error["msg"] for error in exc.errors())
+            errors.append(ImportLineError(line=number, detail=detail))
+        else:
+            if latest is not None and message.timestamp < latest:
+                errors.append(
+                    ImportLineError(line=number, detail="Timestamp is older than the previous line")
+                )
+            else:
+                latest = message.timestamp
+                rows.append((number, message))
+        if len(rows) >= IMPORT_BATCH_SIZE:
+            yield rows, errors
+            rows, errors = [], []
+    if rows or errors:
+        yield rows, errors
+
+
+__all__ = [
+    "IMPORT_BATCH_SIZE",
+    "IMPORT_MAX_ERRORS",
+    "ImportFormatError",
+    "parse_line",
+    "read_batches",
+]
@@ -0,0 +1,103 @@
+"""Redis stream backed queue for background summary jobs.
+
+Jobs are appended to the ``jobs:summaries`` stream and consumed by the worker
+process in :mod:`app.worker` through a consumer group.  Each job's status and
+result live in a ``job:{job_id}`` hash that expires after ``JOB_TTL_SECONDS``.
+"""
+
+from __future__ import annotations
+
+import os
+import uuid
+from datetime import date, datetime, timezone
+from typing import Optional
+
+import redis
+
+from app.models import DiarySummary, SummaryJob
+from app.redis_client import async_redis_client
+
+STREAM_KEY = "jobs:summaries"
+CONSUMER_GROUP = "summarizers"
+STREAM_MAX_LENGTH = 10_000
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", 60 * 60 * 24))
+
+
+def _job_key(job_id: str) -> str:
+    return f"job:{job_id}"
+
+
+async def ensure_group() -> None:
+    """Create the stream and consumer group if they do not exist yet."""
+
+    try:
+        await async_redis_client.xgroup_create(STREAM_KEY, CONSUMER_GROUP, id="0", mkstream=True)
+    except redis.ResponseError as exc:
+        if "BUSYGROUP" not in str(exc):
+            raise
+
+
+async def enqueue_summary(username: str, day: date) -> SummaryJob:
+    job_id = str(uuid.uuid4())
+    now = datetime.now(timezone.utc).isoformat()
+    async with async_redis_client.pipeline() as pipe:
+        pipe.hset(
+            _job_key(job_id),
+            mapping={
+                "username": username,
+                "date": day.isoformat(),
+                "status": "queued",
+                "created_at": now,
+            },
+        )
+        pipe.expire(_job_key(job_id), JOB_TTL_SECONDS)
+        pipe.xadd(
+            STREAM_KEY,
+            {"job_id": job_id, "username": username, "date": day.isoformat()},
+            maxlen=STREAM_MAX_LENGTH,
+            approximate=True,
+        )
+        await pipe.execute()
+    return SummaryJob(job_id=job_id, status="queued", date=day)
+
+
+async def get_job(job_id: str, username: str) -> Optional[SummaryJob]:
+    """Return the job if it exists and belongs to ``username``."""
+
+    data = await async_redis_client.hgetall(_job_key(job_id))
+    if not data or data.get("username") != username:
+        return None
+    result = DiarySummary.parse_raw(data["result"]) if data.get("result") else None
+    return SummaryJob(
+        job_id=job_id,
+        status=data["status"],
+        date=date.fromisoformat(data["date"]),
+        result=result,
+        error=data.get("error"),
+    )
+
+
+async def mark_running(job_id: str) -> None:
+    await async_redis_client.hset(_job_key(job_id), "status", "running")
+
+
+async def mark_done(job_id: str, summary: DiarySummary) -> None:
+    await async_redis_client.hset(
+        _job_key(job_id), mapping={"status": "done", "result": summary.json()}
+    )
+
+
+async def mark_failed(job_id: str, error: str) -> None:
+    await async_redis_client.hset(_job_key(job_id), mapping={"status": "failed", "error": error})
+
+
+__all__ = [
+    "STREAM_KEY",
+    "CONSUMER_GROUP",
+    "ensure_group",
+    "enqueue_summary",
+    "get_job",
+    "mark_running",
+    "mark_done",
+    "mark_failed",
+]
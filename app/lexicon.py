@@ -0,0 +1,142 @@
+"""Weighted word lists compiled into a single-pass matcher for mood scoring.
+
+A lexicon maps lower-case words or phrases to weights (positive for upbeat
+language, negative otherwise).  All entries are compiled once into one regular
+expression whose alternatives are factored through a character trie and
+anchored so they never start or end inside a word, so scoring a whole day is
+a single scan of the text no matter how many entries the lexicon has, and
+``bad`` no longer matches inside ``badminton``.  Entries may contain
+punctuation, e.g. ``:)`` or ``<3``.
+
+The built-in lexicon can be extended or overridden by JSON files listed in
+``MOOD_LEXICON_PATHS`` (separated by ``os.pathsep``), each an object of
+``{"word or phrase": weight}``; later files win and a weight of ``0`` removes an
+entry.  :func:`register_lexicon` does the same at runtime.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Mapping, Pattern
+
+DEFAULT_LEXICON: Dict[str, float] = {
+    "happy": 1.0,
+    "excited": 1.0,
+    "great": 1.0,
+    "awesome": 1.0,
+    "amazing": 1.0,
+    "love": 1.0,
+    "joy": 1.0,
+    "good": 1.0,
+    "fantastic": 1.0,
+    "proud": 1.0,
+    "sad": -1.0,
+    "tired": -1.0,
+    "angry": -1.0,
+    "upset": -1.0,
+    "bad": -1.0,
+    "worried": -1.0,
+    "stress": -1.0,
+    "stressed": -1.0,
+    "anxious": -1.0,
+    "frustrated": -1.0,
+}
+
+_registered: List[Dict[str, float]] = []
+
+
+def _normalise(entry: str) -> str:
+    return " ".join(entry.lower().split())
+
+
+def _is_word_char(char: str) -> bool:
+    return bool(re.match(r"\w", char))
+
+
+def _trie_pattern(node: Dict[str, dict], word_end: bool = False) -> str:
+    """Render a character trie as a regex with shared prefixes factored out.
+
+    An entry ending in a word character must not be followed by one, so
+    ``bad`` never matches inside ``badminton``; ``word_end`` says whether the
+    edge into ``node`` was such a character.
+    """
+
+    branches = []
+    for char in sorted(key for key in node if key):
+        head = r"\s+" if char == " " else re.escape(char)
+        branches.append(head + _trie_pattern(node[char], _is_word_char(char)))
+    if "" in node:
+        # Last, so longer entries are tried first.
+        branches.append(r"(?!\w)" if word_end else "")
+    if len(branches) == 1:
+        return branches[0]
+    return "(?:" + "|".join(branches) + ")"
+
+
+class Lexicon:
+    """A compiled, weighted lexicon."""
+
+    def __init__(self, weights: Mapping[str, float]) -> None:
+        self.weights: Dict[str, float] = {
+            _normalise(entry): weight for entry, weight in weights.items() if weight and entry.strip()
+        }
+        self.pattern: Pattern[str] = self._compile(self.weights)
+
+    @staticmethod
+    def _compile(weights: Mapping[str, float]) -> Pattern[str]:
+        if not weights:
+            return re.compile(r"(?!x)x")  # never matches
+        trie: Dict[str, dict] = {}
+        for entry in weights:
+            node = trie
+            for char in entry:
+                node = node.setdefault(char, {})
+            node[""] = {}
+        # Entries starting with a word character must not start inside a
+        # word either; punctuation such as ``:)`` may touch anything.
+        starts = []
+        for char in sorted(trie):
+            head = r"\s+" if char == " " else re.escape(char)
+            guard = r"(?<!\w)" if _is_word_char(char) else ""
+            starts.append(guard + head + _trie_pattern(trie[char], _is_word_char(char)))
+        return re.compile("|".join(starts))
+
+    def score(self, texts: Iterable[str]) -> float:
+        """Sum the weights of every lexicon match across ``texts`` in one pass."""
+
+        text = "\n".join(texts).lower()
+        return sum(
+            self.weights.get(_normalise(match.group(0)), 0.0)
+            for match in self.pattern.finditer(text)
+        )
+
+
+def _load_files() -> List[Dict[str, float]]:
+    lexicons: List[Dict[str, float]] = []
+    for path in filter(None, os.getenv("MOOD_LEXICON_PATHS", "").split(os.pathsep)):
+        with open(path, encoding="utf-8") as handle:
+            lexicons.append({str(key): float(value) for key, value in json.load(handle).items()})
+    return lexicons
+
+
+@lru_cache(maxsize=1)
+def mood_lexicon() -> Lexicon:
+    """Return the compiled mood lexicon, built once per process."""
+
+    merged = dict(DEFAULT_LEXICON)
+    for extra in [*_load_files(), *_registered]:
+        merged.update({_normalise(key): value for key, value in extra.items()})
+    return Lexicon(merged)
+
+
+def register_lexicon(weights: Mapping[str, float]) -> None:
+    """Merge ``weights`` into the mood lexicon and recompile it."""
+
+    _registered.append(dict(weights))
+    mood_lexicon.cache_clear()
+
+
+__all__ = ["DEFAULT_LEXICON", "Lexicon", "mood_lexicon", "register_lexicon"]
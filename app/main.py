@@ -2,19 +2,37 @@
 
 from __future__ import annotations
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+
+from app import admin, analytics, auth, diary, export, search
+from app.gemini_client import close_http_client
+from app.redis_client import check_async_connection, close_async_client
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    await check_async_connection()
+    yield
+    await close_http_client()
+    await close_async_client()
 
-from app import admin, auth, diary, search
 
-app = FastAPI(title="Diary-AI2 Backend")
+app = FastAPI(
+    title="Diary-AI2 Backend", lifespan=lifespan, default_response_class=ORJSONResponse
+)
 
 # Register routers
 app.include_router(auth.router)
 app.include_router(diary.router)
+app.include_router(export.router)
 app.include_router(search.router)
 app.include_router(admin.router)
+app.include_router(analytics.router)
 
 
 @app.get("/")
-def root():
+async def root():
     return {"msg": "ChatDiary Pro backend running"}
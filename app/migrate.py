@@ -0,0 +1,266 @@
+"""One-shot maintenance commands for existing Redis data.
+
+Run with ``python -m app.migrate <command>``.
+"""
+
+from __future__ import annotations
+
+import argparse
+from datetime import date, datetime, timezone
+from typing import Iterator, List, Optional, Tuple
+
+import redis
+
+from app import codec, counters, features, search_index, tiering, vector_index
+from app.diary import _chat_key, _days_key, _parse_messages, _parse_summary, _summary_key
+from app.redis_client import redis_binary_client, redis_client
+
+BATCH_SIZE = 500
+
+
+def _parse_day_key(key: str) -> Optional[Tuple[str, date]]:
+    """Split a ``chat:{user}:{day}`` / ``coldchat:{user}:{day}`` / ``summary:{user}:{day}`` key."""
+
+    try:
+        prefix_and_user, date_str = key.rsplit(":", 1)
+        _, username = prefix_and_user.split(":", 1)
+        return username, date.fromisoformat(date_str)
+    except ValueError:
+        return None
+
+
+def _iter_day_keys() -> Iterator[Tuple[str, date]]:
+    for pattern in ("chat:*", tiering.cold_key("chat:*"), "summary:*"):
+        for key in redis_client.scan_iter(match=pattern, count=BATCH_SIZE):
+            parsed = _parse_day_key(key)
+            if parsed:
+                yield parsed
+
+
+def backfill_day_index() -> int:
+    """Populate ``days:{user}`` sorted sets from existing chat, cold and summary keys.
+
+    The command is idempotent, so it is safe to re-run while the API is live.
+    """
+
+    indexed = 0
+    pipe = redis_client.pipeline(transaction=False)
+    for username, day in _iter_day_keys():
+        pipe.zadd(_days_key(username), {day.isoformat(): day.toordinal()})
+        indexed += 1
+        if indexed % BATCH_SIZE == 0:
+            pipe.execute()
+    pipe.execute()
+    return indexed
+
+
+def _load_raw_messages(username: str, day: date) -> List[bytes]:
+    pipe = redis_binary_client.pipeline()
+    tiering.queue_load(pipe, _chat_key(username, day))
+    return tiering.merge(*pipe.execute())
+
+
+def _iter_indexed_users() -> Iterator[str]:
+    for key in redis_client.scan_iter(match="days:*", count=BATCH_SIZE):
+        yield key.split(":", 1)[1]
+
+
+def rebuild_search_index() -> int:
+    """Index every stored message and summary into the keyword search index.
+
+    Each user's postings, document lengths and totals are dropped before
+    re-indexing, so the result matches the stored data and re-running is
+    harmless.  Run
+    ``backfill-day-index`` first on deployments that predate the day index.
+    """
+
+    documents = 0
+    for username in _iter_indexed_users():
+        pipe = redis_client.pipeline(transaction=False)
+        search_index.reset_user(pipe, username, search_index.postings_keys(redis_client, username))
+        pipe.execute()
+        for member in redis_client.zrange(_days_key(username), 0, -1):
+            day = date.fromisoformat(member)
+            summary = _parse_summary(redis_client.get(_summary_key(username, day)))
+            messages = _parse_messages(_load_raw_messages(username, day))
+
+            pipe = redis_client.pipeline(transaction=False)
+            for message in messages:
+                search_index.index_message(pipe, username, message)
+            if summary:
+                search_index.index_summary(pipe, username, summary, None)
+            pipe.execute()
+            documents += len(messages) + (1 if summary else 0)
+    return documents
+
+
+def rebuild_vectors() -> int:
+    """Re-embed every stored message into the per-user vector matrices.
+
+    Each user's matrix is rebuilt from scratch, which is also how to migrate
+    after changing ``VECTOR_DIM``.
+    """
+
+    vectors = 0
+    for username in _iter_indexed_users():
+        pipe = redis_client.pipeline(transaction=False)
+        vector_index.reset_user(pipe, username)
+        pipe.execute()
+        for member in redis_client.zrange(_days_key(username), 0, -1):
+            day = date.fromisoformat(member)
+            messages = _parse_messages(_load_raw_messages(username, day))
+            pipe = redis_client.pipeline()
+            vector_index.add_messages(pipe, username, messages)
+            pipe.execute()
+            vectors += len(messages)
+    return vectors
+
+
+def rebuild_features() -> int:
+    """Recompute every user's per-day features and aggregates from stored messages."""
+
+    days = 0
+    for username in _iter_indexed_users():
+        pipe = redis_client.pipeline(transaction=False)
+        features.reset_user(pipe, username)
+        pipe.execute()
+        for member in redis_client.zrange(_days_key(username), 0, -1):
+            day = date.fromisoformat(member)
+            messages = _parse_messages(_load_raw_messages(username, day))
+            pipe = redis_client.pipeline()
+            features.reset_day(pipe, username, day)
+            features.record_messages(pipe, username, messages)
+            pipe.execute()
+            days += 1
+    return days
+
+
+def encode_messages() -> dict:
+    """Re-encode legacy JSON chat messages in the compact binary format.
+
+    Each list is rewritten under ``WATCH`` so a message appended concurrently
+    makes the rewrite retry instead of being lost; lists that are already
+    fully encoded are left untouched, so the command can be re-run at will.
+    """
+
+    lists = rewritten = bytes_before = bytes_after = 0
+    for key in redis_client.scan_iter(match="chat:*", count=BATCH_SIZE):
+        lists += 1
+        with redis_binary_client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    raw_messages = pipe.lrange(key, 0, -1)
+                    if not any(codec.is_legacy(raw) for raw in raw_messages):
+                        pipe.unwatch()
+                        break
+                    encoded = [codec.encode_message(codec.decode_message(raw)) for raw in raw_messages]
+                    pipe.multi()
+                    pipe.delete(key)
+                    pipe.rpush(key, *encoded)
+                    pipe.execute()
+                except redis.WatchError:
+                    continue
+                rewritten += 1
+                bytes_before += sum(len(raw) for raw in raw_messages)
+                bytes_after += sum(len(raw) for raw in encoded)
+                break
+    return {
+        "lists": lists,
+        "rewritten": rewritten,
+        "bytes_before": bytes_before,
+        "bytes_after": bytes_after,
+    }
+
+
+def compact_days(age_days: int) -> dict:
+    """Move chat days older than ``age_days`` into compressed cold storage."""
+
+    def chat_keys_by_day() -> Iterator[Tuple[date, str]]:
+        cutoff = datetime.now(timezone.utc).date().toordinal() - age_days
+        for username in _iter_indexed_users():
+            for member in redis_client.zrangebyscore(_days_key(username), "-inf", cutoff):
+                day = date.fromisoformat(member)
+                yield day, _chat_key(username, day)
+
+    return tiering.compact_old_days(chat_keys_by_day(), age_days)
+
+
+def reconcile_counters() -> dict:
+    """Recompute the dashboard counters and user/session indexes from the keyspace.
+
+    Safe to schedule periodically; it repairs drift left by crashes between a
+    write and its counter update, and drops index entries for sessions that no
+    longer exist.
+    """
+
+    users = 0
+    pipe = redis_client.pipeline(transaction=False)
+    for key in redis_client.scan_iter(match="user:*", count=BATCH_SIZE):
+        counters.record_user(pipe, key.split(":", 1)[1])
+        users += 1
+        if len(pipe) >= BATCH_SIZE:
+            pipe.execute()
+    pipe.execute()
+
+    messages = 0
+    pipe = redis_client.pipeline(transaction=False)
+    for key in redis_client.scan_iter(match="chat:*", count=BATCH_SIZE):
+        pipe.llen(key)
+        if len(pipe) >= BATCH_SIZE:
+            messages += sum(pipe.execute())
+    messages += sum(pipe.execute())
+    for key in redis_client.scan_iter(match=tiering.cold_key("chat:*"), count=BATCH_SIZE):
+        pipe.hget(key, "count")
+        if len(pipe) >= BATCH_SIZE:
+            messages += sum(int(count or 0) for count in pipe.execute())
+    messages += sum(int(count or 0) for count in pipe.execute())
+
+    live_tokens = set()
+    for key in redis_client.scan_iter(match="session:*", count=BATCH_SIZE):
+        token = key.split(":", 1)[1]
+        created_at = redis_client.hget(key, "created_at")
+        if created_at:
+            score = datetime.fromisoformat(created_at).timestamp()
+            redis_client.zadd(counters.SESSIONS_INDEX_KEY, {token: score})
+            live_tokens.add(token)
+    for token in redis_client.zrange(counters.SESSIONS_INDEX_KEY, 0, -1):
+        if token not in live_tokens:
+            redis_client.zrem(counters.SESSIONS_INDEX_KEY, token)
+
+    redis_client.hset(counters.COUNTS_KEY, mapping={"users": users, "messages": messages})
+    return {"users": users, "messages": messages, "sessions": len(live_tokens)}
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.migrate", description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("backfill-day-index", help="Index existing diary days per user.")
+    commands.add_parser("rebuild-search-index", help="Rebuild the keyword search index.")
+    commands.add_parser("rebuild-vectors", help="Rebuild the semantic search vectors.")
+    commands.add_parser("rebuild-features", help="Recompute per-day analytics features.")
+    commands.add_parser("reconcile-counters", help="Repair admin dashboard counters.")
+    commands.add_parser("encode-messages", help="Re-encode JSON messages in the binary format.")
+    compact = commands.add_parser("compact-days", help="Move old chat days to cold storage.")
+    compact.add_argument("--age-days", type=int, default=tiering.TIERING_AGE_DAYS)
+
+    args = parser.parse_args(argv)
+    if args.command == "backfill-day-index":
+        print(f"Indexed {backfill_day_index()} diary days.")
+    elif args.command == "rebuild-search-index":
+        print(f"Indexed {rebuild_search_index()} documents.")
+    elif args.command == "rebuild-vectors":
+        print(f"Embedded {rebuild_vectors()} messages.")
+    elif args.command == "rebuild-features":
+        print(f"Recomputed features for {rebuild_features()} days.")
+    elif args.command == "reconcile-counters":
+        print("Reconciled counters: " + ", ".join(f"{k}={v}" for k, v in reconcile_counters().items()))
+    elif args.command == "encode-messages":
+        print("Encoded messages: " + ", ".join(f"{k}={v}" for k, v in encode_messages().items()))
+    elif args.command == "compact-days":
+        report = compact_days(args.age_days)
+        print("Compacted days: " + ", ".join(f"{k}={v}" for k, v in report.items()))
+
+
+if __name__ == "__main__":
+    main()
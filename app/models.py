@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 from datetime import date, datetime
-from typing import List, Literal, Optional
+from typing import Dict, List, Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -44,6 +44,40 @@ class ChatMessageCreate(BaseModel):
     role: Literal["user", "assistant"] = "user"
 
 
+class ChatMessageBatchItem(ChatMessageCreate):
+    """A queued message with a client-chosen key that makes replays idempotent."""
+
+    idempotency_key: str = Field(..., min_length=1, max_length=128)
+
+
+class ChatMessageBatch(BaseModel):
+    messages: List[ChatMessageBatchItem] = Field(..., min_items=1, max_items=500)
+
+
+class ChatMessageImport(ChatMessageCreate):
+    """One line of a bulk import; keeps the message's original timestamp."""
+
+    timestamp: datetime
+    message_id: Optional[str] = None
+
+
+class ImportLineError(BaseModel):
+    line: int
+    detail: str
+
+
+class ImportReport(BaseModel):
+    """Outcome of a bulk NDJSON import."""
+
+    imported: int
+    failed: int
+    duplicates: int = 0
+    days: int
+    elapsed_seconds: float
+    rows_per_second: float
+    errors: List[ImportLineError] = Field(default_factory=list)
+
+
 class DiarySummary(BaseModel):
     """Structured representation of a diary summary."""
 
@@ -62,6 +96,53 @@ class DiaryTimelineEntry(BaseModel):
 
 class DiaryTimeline(BaseModel):
     entries: List[DiaryTimelineEntry]
+    next_cursor: Optional[str] = None
+
+
+class DiaryMessagePage(BaseModel):
+    date: date
+    messages: List[ChatMessage] = Field(default_factory=list)
+    next_cursor: Optional[str] = None
+
+
+class SummaryJob(BaseModel):
+    """Status of a background summary generation job."""
+
+    job_id: str
+    status: Literal["queued", "running", "done", "failed"]
+    date: date
+    result: Optional[DiarySummary] = None
+    error: Optional[str] = None
+
+
+class TrendBucket(BaseModel):
+    """Activity and mood aggregated over one day, week or month."""
+
+    start: date
+    messages: int
+    words: int
+    active_days: int
+    mood_distribution: Dict[str, int]
+    average_mood: Optional[float] = None
+
+
+class TrendPoint(BaseModel):
+    date: date
+    value: float
+
+
+class StreakStats(BaseModel):
+    current: int
+    longest: int
+
+
+class MoodTrends(BaseModel):
+    start_date: date
+    end_date: date
+    bucket: Literal["day", "week", "month"]
+    buckets: List[TrendBucket] = Field(default_factory=list)
+    rolling_mood: List[TrendPoint] = Field(default_factory=list)
+    streaks: StreakStats
 
 
 class SearchQuery(BaseModel):
@@ -71,6 +152,27 @@ class SearchQuery(BaseModel):
 class SearchResult(BaseModel):
     query: str
     answer: str
+    sources: List[str] = Field(default_factory=list)
+
+
+class SearchMatch(BaseModel):
+    """A message or summary matched by a keyword query."""
+
+    date: date
+    kind: Literal["message", "summary"]
+    text: str
+    message_id: Optional[str] = None
+    score: Optional[float] = None
+
+
+class KeywordSearchResult(BaseModel):
+    query: str
+    matches: List[SearchMatch] = Field(default_factory=list)
+
+
+class SemanticSearchResult(BaseModel):
+    query: str
+    matches: List[SearchMatch] = Field(default_factory=list)
 
 
 __all__ = [
@@ -80,9 +182,23 @@ __all__ = [
     "UserProfile",
     "ChatMessage",
     "ChatMessageCreate",
+    "ChatMessageBatchItem",
+    "ChatMessageBatch",
+    "ChatMessageImport",
+    "ImportLineError",
+    "ImportReport",
     "DiarySummary",
     "DiaryTimelineEntry",
     "DiaryTimeline",
+    "DiaryMessagePage",
+    "SummaryJob",
+    "TrendBucket",
+    "TrendPoint",
+    "StreakStats",
+    "MoodTrends",
     "SearchQuery",
     "SearchResult",
+    "SearchMatch",
+    "KeywordSearchResult",
+    "SemanticSearchResult",
 ]
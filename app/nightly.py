@@ -0,0 +1,152 @@
+"""Bulk summarisation runner that warms every user's daily summaries.
+
+Run with ``python -m app.nightly [--concurrency N] [--run-id ID]``, e.g. from
+cron shortly after midnight.  Every indexed (user, day) pair whose cached
+summary is missing or out of date is summarised, with at most ``N`` Gemini
+calls in flight across all users.  Users are checkpointed in
+``nightly:{run_id}:done`` as they complete, so re-running with the same run id
+after an interruption resumes where it stopped.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from typing import List, Optional
+
+from app import summary_cache
+from app.diary import SUMMARY_PROMPT_VERSION, _chat_key, _list_days, summarize_day
+from app.gemini_client import close_http_client, set_max_concurrency
+from app.redis_client import async_redis_client, check_async_connection, close_async_client
+
+CHECKPOINT_TTL_SECONDS = 60 * 60 * 48
+PROGRESS_EVERY = 100
+
+
+@dataclass
+class RunStats:
+    users: int = 0
+    skipped_users: int = 0
+    summarised: int = 0
+    empty: int = 0
+    failed: int = 0
+    started: float = 0.0
+
+    def report(self) -> str:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return (
+            f"users={self.users} resumed={self.skipped_users} summarised={self.summarised} "
+            f"empty={self.empty} failed={self.failed} elapsed={elapsed:.1f}s "
+            f"throughput={self.summarised / elapsed:.2f} days/s"
+        )
+
+
+def _checkpoint_key(run_id: str) -> str:
+    return f"nightly:{run_id}:done"
+
+
+async def _discover_users() -> List[str]:
+    users = [key.split(":", 1)[1] async for key in async_redis_client.scan_iter(match="days:*")]
+    users.sort()
+    return users
+
+
+async def _stale_days(username: str, until: date) -> List[date]:
+    """Days up to ``until`` whose cached summary is missing or out of date."""
+
+    days = [day for day in await _list_days(username, newest_first=False) if day <= until]
+    if not days:
+        return []
+    chat_keys = [_chat_key(username, day) for day in days]
+    fresh = await summary_cache.unchanged_days(username, days, chat_keys, SUMMARY_PROMPT_VERSION)
+    return [day for day in days if day not in fresh]
+
+
+async def _summarise(username: str, day: date, gate: asyncio.Semaphore, stats: RunStats) -> bool:
+    async with gate:
+        try:
+            summary = await summarize_day(username, day)
+        except Exception as exc:  # pragma: no cover - one bad day must not stop the run
+            stats.failed += 1
+            print(f"failed {username} {day.isoformat()}: {exc}")
+            return False
+    if summary is None:
+        stats.empty += 1
+        return True
+    stats.summarised += 1
+    if stats.summarised % PROGRESS_EVERY == 0:
+        print(stats.report())
+    return True
+
+
+async def _process_user(
+    username: str,
+    until: date,
+    run_id: str,
+    gate: asyncio.Semaphore,
+    user_slots: asyncio.Semaphore,
+    stats: RunStats,
+) -> None:
+    async with user_slots:
+        if await async_redis_client.sismember(_checkpoint_key(run_id), username):
+            stats.skipped_users += 1
+            return
+        days = await _stale_days(username, until)
+        results = await asyncio.gather(*(_summarise(username, day, gate, stats) for day in days))
+        stats.users += 1
+        # Only checkpoint users whose days all succeeded so failures are retried.
+        if all(results):
+            async with async_redis_client.pipeline() as pipe:
+                pipe.sadd(_checkpoint_key(run_id), username)
+                pipe.expire(_checkpoint_key(run_id), CHECKPOINT_TTL_SECONDS)
+                await pipe.execute()
+
+
+async def run(concurrency: int, run_id: str, include_today: bool) -> RunStats:
+    await check_async_connection()
+    # Chunked days fan out into several calls; keep the process under the cap.
+    set_max_concurrency(concurrency)
+    today = datetime.now(timezone.utc).date()
+    until = today if include_today else date.fromordinal(today.toordinal() - 1)
+    gate = asyncio.Semaphore(concurrency)
+    # Bound how many users are in discovery at once so memory stays flat.
+    user_slots = asyncio.Semaphore(concurrency * 2)
+    stats = RunStats(started=time.perf_counter())
+    try:
+        users = await _discover_users()
+        await asyncio.gather(
+            *(_process_user(user, until, run_id, gate, user_slots, stats) for user in users)
+        )
+    finally:
+        await close_http_client()
+        await close_async_client()
+    return stats
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.nightly", description=__doc__)
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=int(os.getenv("NIGHTLY_CONCURRENCY", 8)),
+        help="Maximum number of summaries generated at the same time.",
+    )
+    parser.add_argument(
+        "--run-id",
+        default=datetime.now(timezone.utc).date().isoformat(),
+        help="Checkpoint namespace; reuse it to resume an interrupted run.",
+    )
+    parser.add_argument(
+        "--include-today", action="store_true", help="Also summarise the current day."
+    )
+    args = parser.parse_args(argv)
+    stats = asyncio.run(run(args.concurrency, args.run_id, args.include_today))
+    print(stats.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""Opaque, versioned cursors shared by the paginated endpoints."""
+
+from __future__ import annotations
+
+import base64
+from typing import List
+
+from fastapi import HTTPException, status
+
+CURSOR_VERSION = "v1"
+
+
+def encode_cursor(*parts: str) -> str:
+    raw = ":".join([CURSOR_VERSION, *parts]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, parts: int) -> List[str]:
+    """Decode a cursor made of ``parts`` values, raising 400 if it is malformed.
+
+    Only the last part may contain ``:``.
+    """
+
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        version, *values = base64.urlsafe_b64decode(padded).decode().split(":", parts)
+        if version != CURSOR_VERSION or len(values) != parts:
+            raise ValueError(version)
+        return values
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor") from exc
+
+
+__all__ = ["encode_cursor", "decode_cursor"]
@@ -1,18 +1,35 @@
 """Utility helpers for working with Redis.
 
-This module centralises the creation of the Redis client so that the rest of
+This module centralises the creation of the Redis clients so that the rest of
 our codebase can import a single shared connection.  The URL is resolved from
 an environment variable which keeps the credentials out of the source code and
 allows the app to run in different environments without code changes.
+
+Request handlers use :data:`async_redis_client` so they never block the event
+loop; the synchronous :data:`redis_client` remains for command line tools.
+Chat message lists hold binary values, so each client has a ``*_binary_*``
+twin that returns raw ``bytes`` instead of decoded strings.
+
+Both clients draw from bounded, instrumented connection pools.  Pool size,
+timeouts, health checks and retries are read from ``REDIS_*`` environment
+variables and :func:`pool_stats` reports their usage for monitoring.
 """
 
 from __future__ import annotations
 
 import os
+import threading
+import time
+from dataclasses import dataclass, field
 from functools import lru_cache
+from typing import Dict, Union
 
 import redis
+import redis.asyncio
+import redis.asyncio.retry
 from dotenv import load_dotenv
+from redis.backoff import EqualJitterBackoff
+from redis.retry import Retry
 
 # Load environment variables defined in a local .env file when developing.
 load_dotenv()
@@ -20,12 +37,140 @@ load_dotenv()
 DEFAULT_REDIS_URL = "redis://localhost:6379/0"
 
 
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+REDIS_MAX_CONNECTIONS = _env_int("REDIS_MAX_CONNECTIONS", 50)
+REDIS_POOL_TIMEOUT = _env_float("REDIS_POOL_TIMEOUT", 5.0)
+REDIS_SOCKET_TIMEOUT = _env_float("REDIS_SOCKET_TIMEOUT", 5.0)
+REDIS_SOCKET_CONNECT_TIMEOUT = _env_float("REDIS_SOCKET_CONNECT_TIMEOUT", 2.0)
+REDIS_HEALTH_CHECK_INTERVAL = _env_int("REDIS_HEALTH_CHECK_INTERVAL", 30)
+REDIS_RETRY_ATTEMPTS = _env_int("REDIS_RETRY_ATTEMPTS", 3)
+REDIS_RETRY_BACKOFF_BASE = _env_float("REDIS_RETRY_BACKOFF_BASE", 0.05)
+REDIS_RETRY_BACKOFF_CAP = _env_float("REDIS_RETRY_BACKOFF_CAP", 1.0)
+
+
 class RedisConfigurationError(RuntimeError):
     """Raised when a Redis client cannot be initialised."""
 
 
-@lru_cache(maxsize=1)
-def _create_client() -> redis.Redis:
+@dataclass
+class PoolStats:
+    """Counters describing how a connection pool is being used."""
+
+    max_connections: int
+    created: int = 0
+    in_use: int = 0
+    checkouts: int = 0
+    total_wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record_created(self) -> None:
+        with self._lock:
+            self.created += 1
+
+    def record_checkout(self, waited: float) -> None:
+        with self._lock:
+            self.in_use += 1
+            self.checkouts += 1
+            self.total_wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def record_release(self) -> None:
+        with self._lock:
+            self.in_use = max(self.in_use - 1, 0)
+
+    def snapshot(self) -> Dict[str, Union[int, float]]:
+        with self._lock:
+            avg_wait = self.total_wait_seconds / self.checkouts if self.checkouts else 0.0
+            return {
+                "max_connections": self.max_connections,
+                "created": self.created,
+                "in_use": self.in_use,
+                "idle": max(self.created - self.in_use, 0),
+                "checkouts": self.checkouts,
+                "avg_wait_ms": avg_wait * 1000,
+                "max_wait_ms": self.max_wait_seconds * 1000,
+            }
+
+
+class InstrumentedConnectionPool(redis.BlockingConnectionPool):
+    """Bounded pool that waits for a free connection and records usage."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats(max_connections=self.max_connections)
+
+    def make_connection(self):
+        connection = super().make_connection()
+        self.stats.record_created()
+        return connection
+
+    def get_connection(self, *args, **kwargs):
+        started = time.perf_counter()
+        connection = super().get_connection(*args, **kwargs)
+        self.stats.record_checkout(time.perf_counter() - started)
+        return connection
+
+    def release(self, connection) -> None:
+        super().release(connection)
+        self.stats.record_release()
+
+
+class AsyncInstrumentedConnectionPool(redis.asyncio.BlockingConnectionPool):
+    """Asyncio counterpart of :class:`InstrumentedConnectionPool`."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats(max_connections=self.max_connections)
+
+    def make_connection(self):
+        connection = super().make_connection()
+        self.stats.record_created()
+        return connection
+
+    async def get_connection(self, *args, **kwargs):
+        started = time.perf_counter()
+        connection = await super().get_connection(*args, **kwargs)
+        self.stats.record_checkout(time.perf_counter() - started)
+        return connection
+
+    async def release(self, connection) -> None:
+        await super().release(connection)
+        self.stats.record_release()
+
+
+def _resolve_url() -> str:
+    redis_url = os.getenv("REDIS_URL", DEFAULT_REDIS_URL)
+    if not redis_url:
+        raise RedisConfigurationError("REDIS_URL environment variable is not set.")
+    return redis_url
+
+
+def _pool_kwargs(decode_responses: bool) -> Dict[str, Union[int, float, bool]]:
+    return {
+        "decode_responses": decode_responses,
+        "max_connections": REDIS_MAX_CONNECTIONS,
+        "timeout": REDIS_POOL_TIMEOUT,
+        "socket_timeout": REDIS_SOCKET_TIMEOUT,
+        "socket_connect_timeout": REDIS_SOCKET_CONNECT_TIMEOUT,
+        "health_check_interval": REDIS_HEALTH_CHECK_INTERVAL,
+        "retry_on_timeout": True,
+    }
+
+
+def _backoff() -> EqualJitterBackoff:
+    return EqualJitterBackoff(cap=REDIS_RETRY_BACKOFF_CAP, base=REDIS_RETRY_BACKOFF_BASE)
+
+
+@lru_cache(maxsize=2)
+def _create_client(decode_responses: bool = True) -> redis.Redis:
     """Create and cache a configured Redis client instance.
 
     Returns
@@ -39,12 +184,13 @@ def _create_client() -> redis.Redis:
         If the REDIS_URL cannot be resolved or the connection fails.
     """
 
-    redis_url = os.getenv("REDIS_URL", DEFAULT_REDIS_URL)
-    if not redis_url:
-        raise RedisConfigurationError("REDIS_URL environment variable is not set.")
-
     try:
-        client = redis.from_url(redis_url, decode_responses=True)
+        pool = InstrumentedConnectionPool.from_url(
+            _resolve_url(),
+            retry=Retry(_backoff(), REDIS_RETRY_ATTEMPTS),
+            **_pool_kwargs(decode_responses),
+        )
+        client = redis.Redis(connection_pool=pool)
         # Perform a lightweight ping so we fail fast when credentials are wrong.
         client.ping()
     except redis.RedisError as exc:  # pragma: no cover - defensive programming
@@ -53,8 +199,64 @@ def _create_client() -> redis.Redis:
     return client
 
 
-# Export a module-level client that can be imported by the rest of the app.
+@lru_cache(maxsize=2)
+def _create_async_client(decode_responses: bool = True) -> redis.asyncio.Redis:
+    """Create and cache the shared asyncio Redis client.
+
+    Connections are opened lazily from the client's pool, so the connectivity
+    check happens in :func:`check_async_connection` once an event loop runs.
+    """
+
+    pool = AsyncInstrumentedConnectionPool.from_url(
+        _resolve_url(),
+        retry=redis.asyncio.retry.Retry(_backoff(), REDIS_RETRY_ATTEMPTS),
+        **_pool_kwargs(decode_responses),
+    )
+    return redis.asyncio.Redis(connection_pool=pool)
+
+
+async def check_async_connection() -> None:
+    """Ping Redis through the asyncio client, failing fast on bad credentials."""
+
+    try:
+        await async_redis_client.ping()
+    except redis.RedisError as exc:  # pragma: no cover - defensive programming
+        raise RedisConfigurationError("Unable to connect to Redis") from exc
+
+
+async def close_async_client() -> None:
+    """Release the asyncio clients' pooled connections."""
+
+    for client in (async_redis_client, async_redis_binary_client):
+        await client.aclose()
+        await client.connection_pool.disconnect()
+
+
+def pool_stats() -> Dict[str, Dict[str, Union[int, float]]]:
+    """Return usage counters for the sync and asyncio connection pools."""
+
+    return {
+        "sync": redis_client.connection_pool.stats.snapshot(),
+        "sync_binary": redis_binary_client.connection_pool.stats.snapshot(),
+        "async": async_redis_client.connection_pool.stats.snapshot(),
+        "async_binary": async_redis_binary_client.connection_pool.stats.snapshot(),
+    }
+
+
+# Export module-level clients that can be imported by the rest of the app.
 redis_client: redis.Redis = _create_client()
+redis_binary_client: redis.Redis = _create_client(decode_responses=False)
+async_redis_client: redis.asyncio.Redis = _create_async_client()
+async_redis_binary_client: redis.asyncio.Redis = _create_async_client(decode_responses=False)
 
 
-__all__ = ["redis_client", "RedisConfigurationError"]
+__all__ = [
+    "redis_client",
+    "async_redis_client",
+    "redis_binary_client",
+    "async_redis_binary_client",
+    "check_async_connection",
+    "close_async_client",
+    "pool_stats",
+    "RedisConfigurationError",
+]
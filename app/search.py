@@ -2,64 +2,152 @@
 
 from __future__ import annotations
 
-from typing import Iterable, List
+import os
+from datetime import date
+from typing import Dict, List, Tuple
 
 from fastapi import APIRouter, Depends
 
+from app import search_index, tiering, vector_index
 from app.auth import get_current_user
-from app.gemini_client import generate_summary
-from app.models import SearchQuery, SearchResult
-from app.redis_client import redis_client
+from app.diary import _chat_key, _parse_messages, _parse_summary, _summary_key
+from app.gemini_client import estimate_tokens, generate_summary, truncate_to_tokens
+from app.models import (
+    ChatMessage,
+    KeywordSearchResult,
+    SearchMatch,
+    SearchQuery,
+    SearchResult,
+    SemanticSearchResult,
+)
+from app.redis_client import async_redis_binary_client
 
 router = APIRouter(prefix="/search", tags=["search"])
 
+# Retrieval limits for the Gemini prompt: at most SEARCH_TOP_K ranked chunks,
+# stopping early once their estimated size reaches SEARCH_TOKEN_BUDGET.
+SEARCH_TOP_K = int(os.getenv("SEARCH_TOP_K", 20))
+SEARCH_TOKEN_BUDGET = int(os.getenv("SEARCH_TOKEN_BUDGET", 2000))
 
-def _collect_documents(username: str) -> List[str]:
-    documents: List[str] = []
-    for key in redis_client.scan_iter(match=f"summary:{username}:*"):
-        value = redis_client.get(key)
-        if value:
-            documents.append(value)
-    for key in redis_client.scan_iter(match=f"chat:{username}:*"):
-        for message in redis_client.lrange(key, 0, -1):
-            if message:
-                documents.append(message)
-    return documents
-
-
-def _fallback_search(query: str, documents: Iterable[str]) -> str:
-    query_lower = query.lower()
-    matches: List[str] = []
-    for doc in documents:
-        for line in doc.splitlines():
-            if query_lower in line.lower():
-                matches.append(line.strip())
-                if len(matches) >= 5:
-                    break
-        if len(matches) >= 5:
+
+async def _load_matches(username: str, doc_ids: List[str]) -> List[SearchMatch]:
+    """Fetch the text of indexed documents, touching only the days they live on."""
+
+    parsed = [search_index.parse_doc_id(doc_id) for doc_id in doc_ids]
+    message_days = sorted({day for kind, day, _ in parsed if kind == "m"})
+    summary_days = sorted({day for kind, day, _ in parsed if kind == "s"})
+
+    async with async_redis_binary_client.pipeline() as pipe:
+        for day in message_days:
+            tiering.queue_load(pipe, _chat_key(username, day))
+        for day in summary_days:
+            pipe.get(_summary_key(username, day))
+        results = await pipe.execute()
+
+    messages: Dict[str, ChatMessage] = {}
+    for index in range(len(message_days)):
+        raw_messages = tiering.merge(results[2 * index], results[2 * index + 1])
+        for message in _parse_messages(raw_messages):
+            messages[message.message_id] = message
+    summaries: Dict[date, str] = {}
+    for day, raw in zip(summary_days, results[2 * len(message_days) :]):
+        summary = _parse_summary(raw)
+        if summary:
+            summaries[day] = summary.summary
+
+    matches: List[SearchMatch] = []
+    for kind, day, message_id in parsed:
+        if kind == "m" and message_id in messages:
+            text = messages[message_id].text
+            matches.append(SearchMatch(date=day, kind="message", text=text, message_id=message_id))
+        elif kind == "s" and day in summaries:
+            matches.append(SearchMatch(date=day, kind="summary", text=summaries[day]))
+    return matches
+
+
+def _doc_id(match: SearchMatch) -> str:
+    if match.kind == "message" and match.message_id:
+        return search_index.message_doc_id(match.date, match.message_id)
+    return search_index.summary_doc_id(match.date)
+
+
+async def _retrieve(username: str, query: str) -> List[Tuple[str, SearchMatch]]:
+    """Return the best-ranked chunks for ``query`` that fit the token budget."""
+
+    ranked = await search_index.rank(username, query, limit=SEARCH_TOP_K)
+    matches = await _load_matches(username, [doc_id for doc_id, _ in ranked])
+
+    selected: List[Tuple[str, SearchMatch]] = []
+    used_tokens = 0
+    for match in matches:
+        remaining = SEARCH_TOKEN_BUDGET - used_tokens
+        if remaining <= 0:
             break
+        if estimate_tokens(match.text) > remaining:
+            # Keep the head of an oversized chunk rather than overrunning the budget.
+            match = match.copy(update={"text": truncate_to_tokens(match.text, remaining)})
+        selected.append((_doc_id(match), match))
+        used_tokens += estimate_tokens(match.text)
+    return selected
+
+
+async def _fallback_search(username: str, query: str) -> str:
+    doc_ids = await search_index.search(username, query, limit=5)
+    matches = await _load_matches(username, doc_ids)
     if matches:
-        return "\n".join(matches)
+        return "\n".join(match.text.strip() for match in matches)
     return "No matching entries found."
 
 
 @router.post("/", response_model=SearchResult)
-def search_diary(
+async def search_diary(
     query: SearchQuery, username: str = Depends(get_current_user)
 ) -> SearchResult:
-    documents = _collect_documents(username)
-    if not documents:
+    if not await search_index.document_count(username):
         return SearchResult(query=query.query, answer="No diary content available yet.")
 
-    joined_documents = "\n".join(documents)
+    chunks = await _retrieve(username, query.query)
+    if not chunks:
+        return SearchResult(query=query.query, answer="No matching entries found.")
+
+    diary_content = "\n".join(
+        f"[{match.date.isoformat()} {match.kind}] {match.text}" for _, match in chunks
+    )
     prompt = (
         "You are helping the user search through their personal diary. "
         "Respond with a concise answer that references the diary content when possible.\n"
-        f"Diary content:\n{joined_documents}\n\n"
+        f"Diary content:\n{diary_content}\n\n"
         f"Question: {query.query}\n"
         "Answer:"
     )
-    answer = generate_summary(prompt)
-    if not answer.strip():
-        answer = _fallback_search(query.query, documents)
-    return SearchResult(query=query.query, answer=answer.strip())
+    answer, from_model = await generate_summary(prompt)
+    if not from_model or not answer.strip():
+        # The local summariser would only echo the prompt; list the matches instead.
+        answer = await _fallback_search(username, query.query)
+    sources = [doc_id for doc_id, _ in chunks]
+    return SearchResult(query=query.query, answer=answer.strip(), sources=sources)
+
+
+@router.post("/keywords", response_model=KeywordSearchResult)
+async def keyword_search(
+    query: SearchQuery, username: str = Depends(get_current_user)
+) -> KeywordSearchResult:
+    """Match terms, ``OR`` alternatives and ``"quoted phrases"`` via the index."""
+
+    doc_ids = await search_index.search(username, query.query)
+    matches = await _load_matches(username, doc_ids)
+    return KeywordSearchResult(query=query.query, matches=matches)
+
+
+@router.post("/semantic", response_model=SemanticSearchResult)
+async def semantic_search(
+    query: SearchQuery, username: str = Depends(get_current_user)
+) -> SemanticSearchResult:
+    """Rank messages by cosine similarity of locally computed embeddings."""
+
+    ranked = await vector_index.search(username, query.query)
+    scores = dict(ranked)
+    matches = await _load_matches(username, [doc_id for doc_id, _ in ranked])
+    for match in matches:
+        match.score = round(scores[_doc_id(match)], 4)
+    return SemanticSearchResult(query=query.query, matches=matches)
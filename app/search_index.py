@@ -0,0 +1,303 @@
+"""Per-user positional inverted index over diary messages and summaries.
+
+Every token maps to a Redis hash ``idx:{username}:{token}`` whose fields are
+document ids and whose values are the comma separated token positions inside
+that document.  Document ids are ``m:{day}:{message_id}`` for chat messages and
+``s:{day}`` for daily summaries, so a query only touches the postings of its
+own terms instead of the user's whole history.
+
+Queries are a disjunction of groups separated by ``OR``; within a group every
+bare term and every ``"quoted phrase"`` must match.  Document lengths and
+corpus totals are kept alongside the postings so :func:`rank` can score
+documents with BM25 without loading any document text.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from app.models import ChatMessage, DiarySummary
+from app.redis_client import async_redis_client
+
+TOKEN_PATTERN = re.compile(r"\w+")
+PHRASE_PATTERN = re.compile(r'"([^"]*)"')
+OR_PATTERN = re.compile(r"\s+OR\s+")
+GLOB_SPECIAL = re.compile(r"([*?\[\]\\])")
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+Postings = Dict[str, Dict[str, Set[int]]]
+
+
+class IndexedDocument(NamedTuple):
+    """What was indexed for a document, needed to remove it again."""
+
+    tokens: List[str]
+    length: int
+
+
+@dataclass
+class QueryGroup:
+    """Terms and phrases that must all occur in a matching document."""
+
+    terms: List[str] = field(default_factory=list)
+    phrases: List[List[str]] = field(default_factory=list)
+
+    def tokens(self) -> Set[str]:
+        tokens = set(self.terms)
+        for phrase in self.phrases:
+            tokens.update(phrase)
+        return tokens
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def _postings_key(username: str, token: str) -> str:
+    return f"idx:{username}:{token}"
+
+
+def _doc_terms_key(username: str) -> str:
+    """Hash of summary document id to its indexed tokens, used for re-indexing."""
+
+    return f"idxterms:{username}"
+
+
+def _doc_lengths_key(username: str) -> str:
+    return f"idxlen:{username}"
+
+
+def _stats_key(username: str) -> str:
+    return f"idxstats:{username}"
+
+
+def message_doc_id(day: date, message_id: str) -> str:
+    return f"m:{day.isoformat()}:{message_id}"
+
+
+def summary_doc_id(day: date) -> str:
+    return f"s:{day.isoformat()}"
+
+
+def parse_doc_id(doc_id: str) -> Tuple[str, date, Optional[str]]:
+    """Split a document id into ``(kind, day, message_id)``."""
+
+    kind, date_str, *rest = doc_id.split(":", 2)
+    return kind, date.fromisoformat(date_str), rest[0] if rest else None
+
+
+def summary_text(summary: DiarySummary) -> str:
+    return " ".join([summary.summary, *summary.highlights, *summary.tags, summary.mood or ""])
+
+
+def _positions(tokens: Iterable[str]) -> Dict[str, List[int]]:
+    positions: Dict[str, List[int]] = {}
+    for position, token in enumerate(tokens):
+        positions.setdefault(token, []).append(position)
+    return positions
+
+
+def add_document(pipe, username: str, doc_id: str, text: str) -> List[str]:
+    """Queue the postings for ``text`` on ``pipe`` and return its distinct tokens.
+
+    ``pipe`` may be a synchronous or asyncio pipeline; commands are only
+    buffered here and sent when the caller executes it.
+    """
+
+    tokens = tokenize(text)
+    positions = _positions(tokens)
+    for token, token_positions in positions.items():
+        pipe.hset(_postings_key(username, token), doc_id, ",".join(map(str, token_positions)))
+    pipe.hset(_doc_lengths_key(username), doc_id, len(tokens))
+    pipe.hincrby(_stats_key(username), "tokens", len(tokens))
+    return list(positions)
+
+
+def remove_document(pipe, username: str, doc_id: str, document: IndexedDocument) -> None:
+    for token in document.tokens:
+        pipe.hdel(_postings_key(username, token), doc_id)
+    pipe.hdel(_doc_lengths_key(username), doc_id)
+    pipe.hincrby(_stats_key(username), "tokens", -document.length)
+
+
+def postings_keys(client, username: str, count: int = 500) -> Iterator[str]:
+    """Yield every ``idx:{username}:{token}`` key using a synchronous ``client``."""
+
+    prefix = _postings_key(username, "")
+    pattern = GLOB_SPECIAL.sub(r"\\\1", prefix) + "*"
+    for key in client.scan_iter(match=pattern, count=count):
+        # Tokens never contain ":", so longer keys belong to another username.
+        if ":" not in key[len(prefix) :]:
+            yield key
+
+
+def reset_user(pipe, username: str, postings: Iterable[str], batch: int = 500) -> None:
+    """Queue dropping the user's whole index before a rebuild.
+
+    ``postings`` are the user's posting keys (see :func:`postings_keys`);
+    deleting them too keeps tokens that no longer occur from lingering.
+    """
+
+    pipe.delete(_doc_terms_key(username), _doc_lengths_key(username), _stats_key(username))
+    keys: List[str] = []
+    for key in postings:
+        keys.append(key)
+        if len(keys) == batch:
+            pipe.delete(*keys)
+            keys = []
+    if keys:
+        pipe.delete(*keys)
+
+
+def index_message(pipe, username: str, message: ChatMessage) -> None:
+    doc_id = message_doc_id(message.timestamp.date(), message.message_id)
+    add_document(pipe, username, doc_id, message.text)
+
+
+def index_summary(
+    pipe, username: str, summary: DiarySummary, previous: Optional[IndexedDocument]
+) -> None:
+    """Replace the postings of a day's summary with those of ``summary``."""
+
+    doc_id = summary_doc_id(summary.date)
+    if previous:
+        remove_document(pipe, username, doc_id, previous)
+    tokens = add_document(pipe, username, doc_id, summary_text(summary))
+    pipe.hset(_doc_terms_key(username), doc_id, " ".join(tokens))
+
+
+def _indexed_document(terms: Optional[str], length: Optional[str]) -> Optional[IndexedDocument]:
+    if terms is None:
+        return None
+    return IndexedDocument(tokens=terms.split(), length=int(length or 0))
+
+
+async def load_summary_document(username: str, day: date) -> Optional[IndexedDocument]:
+    doc_id = summary_doc_id(day)
+    async with async_redis_client.pipeline(transaction=False) as pipe:
+        pipe.hget(_doc_terms_key(username), doc_id)
+        pipe.hget(_doc_lengths_key(username), doc_id)
+        terms, length = await pipe.execute()
+    return _indexed_document(terms, length)
+
+
+async def document_count(username: str) -> int:
+    return await async_redis_client.hlen(_doc_lengths_key(username))
+
+
+def parse_query(query: str) -> List[QueryGroup]:
+    groups: List[QueryGroup] = []
+    for part in OR_PATTERN.split(query.strip()):
+        phrases = [tokens for tokens in map(tokenize, PHRASE_PATTERN.findall(part)) if tokens]
+        group = QueryGroup(
+            terms=tokenize(PHRASE_PATTERN.sub(" ", part)),
+            phrases=[phrase for phrase in phrases if len(phrase) > 1],
+        )
+        group.terms.extend(phrase[0] for phrase in phrases if len(phrase) == 1)
+        if group.tokens():
+            groups.append(group)
+    return groups
+
+
+async def _load_postings(username: str, tokens: Iterable[str]) -> Postings:
+    tokens = sorted(set(tokens))
+    async with async_redis_client.pipeline(transaction=False) as pipe:
+        for token in tokens:
+            pipe.hgetall(_postings_key(username, token))
+        results = await pipe.execute()
+
+    postings: Postings = {}
+    for token, raw in zip(tokens, results):
+        postings[token] = {
+            doc_id: {int(position) for position in value.split(",")}
+            for doc_id, value in raw.items()
+        }
+    return postings
+
+
+def _contains_phrase(postings: Postings, doc_id: str, phrase: List[str]) -> bool:
+    starts = postings[phrase[0]][doc_id]
+    for offset, token in enumerate(phrase[1:], start=1):
+        positions = postings[token][doc_id]
+        starts = {start for start in starts if start + offset in positions}
+        if not starts:
+            return False
+    return True
+
+
+def _match_group(postings: Postings, group: QueryGroup) -> Set[str]:
+    doc_sets = sorted((set(postings[token]) for token in group.tokens()), key=len)
+    candidates = doc_sets[0].intersection(*doc_sets[1:])
+    for phrase in group.phrases:
+        candidates = {doc_id for doc_id in candidates if _contains_phrase(postings, doc_id, phrase)}
+    return candidates
+
+
+async def search(username: str, query: str, limit: int = 20) -> List[str]:
+    """Return ids of documents matching ``query``, most recent day first."""
+
+    groups = parse_query(query)
+    if not groups:
+        return []
+    postings = await _load_postings(
+        username, (token for group in groups for token in group.tokens())
+    )
+
+    matched: Set[str] = set()
+    for group in groups:
+        matched |= _match_group(postings, group)
+    return sorted(matched, key=lambda doc_id: (parse_doc_id(doc_id)[1], doc_id), reverse=True)[:limit]
+
+
+async def rank(username: str, query: str, limit: int = 20) -> List[Tuple[str, float]]:
+    """Score documents containing any query term with BM25, best first."""
+
+    tokens = {token for group in parse_query(query) for token in group.tokens()}
+    if not tokens:
+        return []
+    postings = await _load_postings(username, tokens)
+    candidates = sorted({doc_id for docs in postings.values() for doc_id in docs})
+    if not candidates:
+        return []
+
+    async with async_redis_client.pipeline(transaction=False) as pipe:
+        pipe.hlen(_doc_lengths_key(username))
+        pipe.hget(_stats_key(username), "tokens")
+        pipe.hmget(_doc_lengths_key(username), candidates)
+        total_docs, total_tokens, lengths = await pipe.execute()
+
+    total_docs = max(int(total_docs), 1)
+    avg_length = max(int(total_tokens or 0) / total_docs, 1.0)
+    doc_lengths = {doc_id: int(length or 0) for doc_id, length in zip(candidates, lengths)}
+
+    scores: Dict[str, float] = {}
+    for token, docs in postings.items():
+        if not docs:
+            continue
+        idf = math.log(1 + (total_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+        for doc_id, positions in docs.items():
+            tf = len(positions)
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_lengths[doc_id] / avg_length)
+            scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+__all__ = [
+    "tokenize",
+    "parse_query",
+    "parse_doc_id",
+    "postings_keys",
+    "reset_user",
+    "index_message",
+    "index_summary",
+    "load_summary_document",
+    "document_count",
+    "search",
+    "rank",
+]
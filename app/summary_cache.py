@@ -0,0 +1,157 @@
+"""Content-addressed cache for generated daily summaries.
+
+Generated summaries are stored under ``summary_cache:{username}:{digest}``
+where the digest hashes the day's messages together with the prompt template
+version, so an unchanged day never needs a second Gemini call.  A per-day
+pointer ``summary_digest:{username}:{day}`` remembers the digest of the latest
+summary and the message count it covered; appending a message deletes it,
+which lets a repeated request for an unchanged day hit the cache without even
+reloading the message list.  The count guards against an append racing with
+a summary being stored.
+
+Long days are summarised chunk by chunk; each chunk's partial summary, and
+each reduction of several partial summaries, is kept under
+``summary_chunk:{username}:{digest}`` so that appending messages only costs
+new calls for the parts that changed.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Set
+
+from app import tiering
+from app.models import ChatMessage, DiarySummary
+from app.redis_client import async_redis_client
+
+SUMMARY_CACHE_TTL_SECONDS = int(os.getenv("SUMMARY_CACHE_TTL_SECONDS", 60 * 60 * 24 * 30))
+STATS_KEY = "stats:summary_cache"
+
+
+def _cache_key(username: str, digest: str) -> str:
+    return f"summary_cache:{username}:{digest}"
+
+
+def _chunk_key(username: str, digest: str) -> str:
+    return f"summary_chunk:{username}:{digest}"
+
+
+def _pointer_key(username: str, day: date) -> str:
+    return f"summary_digest:{username}:{day.isoformat()}"
+
+
+def compute_digest(messages: Iterable[ChatMessage], prompt_version: str) -> str:
+    """Hash the messages; the prompt version prefix makes old entries unreachable."""
+
+    hasher = hashlib.sha256()
+    for message in messages:
+        hasher.update(message.json().encode())
+        hasher.update(b"\n")
+    return f"{prompt_version}:{hasher.hexdigest()}"
+
+
+def compute_text_digest(texts: Iterable[str], prompt_version: str) -> str:
+    """Hash partial summaries that are reduced together, like :func:`compute_digest`."""
+
+    hasher = hashlib.sha256(b"reduce\n")
+    for text in texts:
+        hasher.update(text.encode())
+        hasher.update(b"\0")
+    return f"{prompt_version}:{hasher.hexdigest()}"
+
+
+def invalidate(pipe, username: str, day: date) -> None:
+    """Queue removal of the day's pointer; call whenever the day changes."""
+
+    pipe.delete(_pointer_key(username, day))
+
+
+def _pointer_matches(pointer: str, message_count: int, prompt_version: str) -> bool:
+    digest, _, covered = pointer.rpartition("#")
+    return digest.startswith(f"{prompt_version}:") and covered == str(message_count)
+
+
+async def current_digest(
+    username: str, day: date, chat_key: str, prompt_version: str
+) -> Optional[str]:
+    """Return the digest of the day's cached summary if the day is unchanged."""
+
+    async with async_redis_client.pipeline() as pipe:
+        pipe.get(_pointer_key(username, day))
+        tiering.queue_count(pipe, chat_key)
+        pointer, cold_count, hot_count = await pipe.execute()
+    message_count = tiering.total(cold_count, hot_count)
+    if pointer and _pointer_matches(pointer, message_count, prompt_version):
+        return pointer.rpartition("#")[0]
+    return None
+
+
+async def unchanged_days(
+    username: str, days: List[date], chat_keys: List[str], prompt_version: str
+) -> Set[date]:
+    """Return which of ``days`` still have an up-to-date cached summary."""
+
+    async with async_redis_client.pipeline() as pipe:
+        for day, chat_key in zip(days, chat_keys):
+            pipe.get(_pointer_key(username, day))
+            tiering.queue_count(pipe, chat_key)
+        results = await pipe.execute()
+
+    fresh: Set[date] = set()
+    for index, day in enumerate(days):
+        pointer, cold_count, hot_count = results[3 * index : 3 * index + 3]
+        message_count = tiering.total(cold_count, hot_count)
+        if pointer and _pointer_matches(pointer, message_count, prompt_version):
+            fresh.add(day)
+    return fresh
+
+
+async def get(username: str, digest: str) -> Optional[DiarySummary]:
+    raw = await async_redis_client.get(_cache_key(username, digest))
+    if not raw:
+        return None
+    try:
+        return DiarySummary.parse_raw(raw)
+    except Exception:  # pragma: no cover - defensive against bad data
+        return None
+
+
+def put(pipe, username: str, digest: str, summary: DiarySummary, message_count: int) -> None:
+    pipe.set(_cache_key(username, digest), summary.json(), ex=SUMMARY_CACHE_TTL_SECONDS)
+    pipe.set(_pointer_key(username, summary.date), f"{digest}#{message_count}")
+
+
+async def get_chunks(username: str, digests: List[str]) -> List[Optional[str]]:
+    if not digests:
+        return []
+    return await async_redis_client.mget([_chunk_key(username, digest) for digest in digests])
+
+
+def put_chunk(pipe, username: str, digest: str, text: str) -> None:
+    pipe.set(_chunk_key(username, digest), text, ex=SUMMARY_CACHE_TTL_SECONDS)
+
+
+async def record_lookup(hit: bool) -> None:
+    await async_redis_client.hincrby(STATS_KEY, "hits" if hit else "misses", 1)
+
+
+async def stats() -> Dict[str, int]:
+    raw = await async_redis_client.hgetall(STATS_KEY)
+    return {"hits": int(raw.get("hits", 0)), "misses": int(raw.get("misses", 0))}
+
+
+__all__ = [
+    "compute_digest",
+    "compute_text_digest",
+    "invalidate",
+    "current_digest",
+    "unchanged_days",
+    "get",
+    "put",
+    "get_chunks",
+    "put_chunk",
+    "record_lookup",
+    "stats",
+]
@@ -0,0 +1,134 @@
+"""Cold storage for old chat days.
+
+Days older than ``TIERING_AGE_DAYS`` can be compacted with
+``python -m app.migrate compact-days``: the day's message list is replaced by
+a hash ``cold{chat_key}`` (e.g. ``coldchat:{username}:{day}``) whose
+``messages`` field is one zlib-compressed msgpack array of the encoded
+messages and whose ``count`` field is their number.
+
+Messages stored after compaction are appended to the list as usual, so the
+cold blob is always a prefix of the day.  Readers queue both parts with
+:func:`queue_load` and join them with :func:`merge`, which rehydrates the blob
+transparently; :func:`queue_count` gives the day's total message count.  Both
+must be queued on a transactional (``MULTI``) pipeline: a compaction landing
+between the two reads would otherwise hide the day or count it twice.
+"""
+
+from __future__ import annotations
+
+import os
+import zlib
+from datetime import date, datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import msgpack
+import redis
+
+from app.redis_client import redis_binary_client
+
+TIERING_AGE_DAYS = int(os.getenv("TIERING_AGE_DAYS", 30))
+TIERING_COMPRESS_LEVEL = int(os.getenv("TIERING_COMPRESS_LEVEL", 6))
+
+
+def cold_key(chat_key: str) -> str:
+    return f"cold{chat_key}"
+
+
+def pack(raw_messages: Iterable[bytes]) -> bytes:
+    return zlib.compress(msgpack.packb(list(raw_messages), use_bin_type=True), TIERING_COMPRESS_LEVEL)
+
+
+def unpack(blob: bytes) -> List[bytes]:
+    return msgpack.unpackb(zlib.decompress(blob), raw=False)
+
+
+def queue_load(pipe, chat_key: str, start: int = 0, stop: int = -1) -> None:
+    """Queue reading a day's messages; pass both results to :func:`merge`.
+
+    ``start`` and ``stop`` bound the part of the day that is still a list.
+    """
+
+    pipe.hget(cold_key(chat_key), "messages")
+    pipe.lrange(chat_key, start, stop)
+
+
+def merge(blob: Optional[bytes], raw_messages: List[Union[bytes, str]]) -> List[Union[bytes, str]]:
+    if not blob:
+        return raw_messages
+    return [*unpack(blob), *raw_messages]
+
+
+def queue_count(pipe, chat_key: str) -> None:
+    """Queue counting a day's messages; pass both results to :func:`total`."""
+
+    pipe.hget(cold_key(chat_key), "count")
+    pipe.llen(chat_key)
+
+
+def total(cold_count: Optional[Union[bytes, str]], hot_count: int) -> int:
+    return int(cold_count or 0) + int(hot_count)
+
+
+def _memory_usage(*keys: str) -> int:
+    return sum(redis_binary_client.memory_usage(key) or 0 for key in keys)
+
+
+def compact_day(chat_key: str) -> Optional[Dict[str, int]]:
+    """Move a day's message list into its compressed cold blob.
+
+    The list is watched so a message appended meanwhile makes the compaction
+    retry rather than being dropped.  Returns ``None`` if the list is empty.
+    """
+
+    key = cold_key(chat_key)
+    with redis_binary_client.pipeline() as pipe:
+        while True:
+            try:
+                pipe.watch(chat_key, key)
+                raw_messages = pipe.lrange(chat_key, 0, -1)
+                if not raw_messages:
+                    pipe.unwatch()
+                    return None
+                before = _memory_usage(chat_key, key)
+                messages = merge(pipe.hget(key, "messages"), raw_messages)
+                pipe.multi()
+                pipe.hset(key, mapping={"messages": pack(messages), "count": len(messages)})
+                pipe.delete(chat_key)
+                pipe.execute()
+                break
+            except redis.WatchError:
+                continue
+    return {"messages": len(raw_messages), "bytes_before": before, "bytes_after": _memory_usage(key)}
+
+
+def compact_old_days(
+    chat_keys_by_day: Iterable[Tuple[date, str]], age_days: int = TIERING_AGE_DAYS
+) -> Dict[str, int]:
+    """Compact every ``(day, chat_key)`` older than ``age_days`` and total the savings."""
+
+    cutoff = datetime.now(timezone.utc).date().toordinal() - age_days
+    report = {"days": 0, "messages": 0, "bytes_before": 0, "bytes_after": 0}
+    for day, chat_key in chat_keys_by_day:
+        if day.toordinal() > cutoff:
+            continue
+        compacted = compact_day(chat_key)
+        if compacted:
+            report["days"] += 1
+            for field, value in compacted.items():
+                report[field] += value
+    report["bytes_reclaimed"] = report["bytes_before"] - report["bytes_after"]
+    return report
+
+
+__all__ = [
+    "TIERING_AGE_DAYS",
+    "cold_key",
+    "pack",
+    "unpack",
+    "queue_load",
+    "merge",
+    "queue_count",
+    "total",
+    "compact_day",
+    "compact_old_days",
+]
@@ -0,0 +1,109 @@
+"""Offline semantic search over diary messages using hashed embeddings.
+
+Messages are embedded locally with a signed hashing vectorizer over unigrams
+and bigrams (no model download, no network) into ``VECTOR_DIM`` float32
+dimensions and L2-normalised.  Each user's embeddings form one compact matrix
+stored as raw bytes in ``vec:{username}:d{dim}``; new rows are appended with
+``APPEND`` in the same transaction that stores the message, and the matching
+document ids are pushed onto ``vecids:{username}:d{dim}`` so row ``i`` of the
+matrix always belongs to id ``i``.  Queries are scored against the whole
+matrix with a single NumPy matrix-vector product.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+from app.models import ChatMessage
+from app.redis_client import async_redis_binary_client, async_redis_client
+from app.search_index import message_doc_id, tokenize
+
+VECTOR_DIM = int(os.getenv("VECTOR_DIM", 256))
+
+
+def _matrix_key(username: str) -> str:
+    return f"vec:{username}:d{VECTOR_DIM}"
+
+
+def _ids_key(username: str) -> str:
+    return f"vecids:{username}:d{VECTOR_DIM}"
+
+
+def _features(text: str) -> Iterable[str]:
+    tokens = tokenize(text)
+    yield from tokens
+    yield from (f"{first} {second}" for first, second in zip(tokens, tokens[1:]))
+
+
+def _bucket(feature: str) -> Tuple[int, float]:
+    # A stable hash: Python's hash() is salted per process.
+    value = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+    return value % VECTOR_DIM, 1.0 if value >> 63 else -1.0
+
+
+def embed_batch(texts: List[str]) -> np.ndarray:
+    """Embed ``texts`` into an L2-normalised ``(len(texts), VECTOR_DIM)`` matrix."""
+
+    matrix = np.zeros((len(texts), VECTOR_DIM), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for feature in _features(text):
+            column, sign = _bucket(feature)
+            matrix[row, column] += sign
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def add_vectors(pipe, username: str, doc_ids: List[str], texts: List[str]) -> None:
+    """Queue appending the embeddings of ``texts`` to the user's matrix."""
+
+    if not doc_ids:
+        return
+    pipe.append(_matrix_key(username), embed_batch(texts).tobytes())
+    pipe.rpush(_ids_key(username), *doc_ids)
+
+
+def add_messages(pipe, username: str, messages: List[ChatMessage]) -> None:
+    doc_ids = [message_doc_id(message.timestamp.date(), message.message_id) for message in messages]
+    add_vectors(pipe, username, doc_ids, [message.text for message in messages])
+
+
+def reset_user(pipe, username: str) -> None:
+    """Queue dropping the user's matrix, e.g. before rebuilding it."""
+
+    pipe.delete(_matrix_key(username), _ids_key(username))
+
+
+async def search(username: str, query: str, limit: int = 10) -> List[Tuple[str, float]]:
+    """Return ``(doc_id, cosine similarity)`` pairs for the closest messages."""
+
+    query_vector = embed_batch([query])[0]
+    if not query_vector.any():
+        return []
+    raw = await async_redis_binary_client.get(_matrix_key(username))
+    if not raw:
+        return []
+    matrix = np.frombuffer(raw, dtype=np.float32)
+    matrix = matrix[: matrix.size - matrix.size % VECTOR_DIM].reshape(-1, VECTOR_DIM)
+
+    scores = matrix @ query_vector
+    k = min(limit, scores.size)
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+
+    async with async_redis_client.pipeline(transaction=False) as pipe:
+        for row in top:
+            pipe.lindex(_ids_key(username), int(row))
+        doc_ids = await pipe.execute()
+    return [
+        (doc_id, float(scores[row]))
+        for row, doc_id in zip(top, doc_ids)
+        if doc_id is not None and scores[row] > 0
+    ]
+
+
+__all__ = ["VECTOR_DIM", "embed_batch", "add_vectors", "add_messages", "reset_user", "search"]
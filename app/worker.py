@@ -0,0 +1,136 @@
+"""Background worker that processes queued summary jobs.
+
+Run with ``python -m app.worker [--concurrency N]``.  Each of the ``N``
+consumers reads one job at a time from the stream, so at most ``N`` Gemini
+calls are in flight per worker process.  Every
+``JOB_RECLAIM_INTERVAL_SECONDS`` each consumer also claims jobs that another
+(crashed) consumer left pending for longer than ``JOB_RECLAIM_IDLE_MS``, a page
+at a time until none are left.  Redis errors are logged and retried with
+backoff instead of stopping the consumer.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import socket
+import time
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+import redis
+
+from app import jobs
+from app.diary import summarize_day
+from app.gemini_client import close_http_client, set_max_concurrency
+from app.redis_client import async_redis_client, check_async_connection, close_async_client
+
+JOB_RECLAIM_IDLE_MS = int(os.getenv("JOB_RECLAIM_IDLE_MS", 5 * 60 * 1000))
+JOB_RECLAIM_INTERVAL_SECONDS = float(os.getenv("JOB_RECLAIM_INTERVAL_SECONDS", 60))
+JOB_RECLAIM_BATCH = 100
+READ_BLOCK_MS = 5000
+ERROR_BACKOFF_BASE_SECONDS = 0.5
+ERROR_BACKOFF_CAP_SECONDS = 30.0
+
+StreamEntry = Tuple[str, Dict[str, str]]
+
+
+async def _process(entry_id: str, fields: Dict[str, str]) -> None:
+    job_id = fields["job_id"]
+    try:
+        await jobs.mark_running(job_id)
+        summary = await summarize_day(fields["username"], date.fromisoformat(fields["date"]))
+        if summary is None:
+            await jobs.mark_failed(job_id, "No chat history for the requested date")
+        else:
+            await jobs.mark_done(job_id, summary)
+    except Exception as exc:  # pragma: no cover - keep the consumer alive
+        await jobs.mark_failed(job_id, str(exc) or exc.__class__.__name__)
+    finally:
+        await async_redis_client.xack(jobs.STREAM_KEY, jobs.CONSUMER_GROUP, entry_id)
+
+
+async def _process_entries(entries: List[StreamEntry]) -> None:
+    for entry_id, fields in entries:
+        if fields:
+            await _process(entry_id, fields)
+        else:
+            # Trimmed from the stream while pending; nothing left to run.
+            await async_redis_client.xack(jobs.STREAM_KEY, jobs.CONSUMER_GROUP, entry_id)
+
+
+async def _reclaim_stale(consumer: str) -> int:
+    """Claim and process every job idle for ``JOB_RECLAIM_IDLE_MS``, a page at a time."""
+
+    reclaimed = 0
+    cursor = "0-0"
+    while True:
+        cursor, entries, *_ = await async_redis_client.xautoclaim(
+            jobs.STREAM_KEY,
+            jobs.CONSUMER_GROUP,
+            consumer,
+            min_idle_time=JOB_RECLAIM_IDLE_MS,
+            start_id=cursor,
+            count=JOB_RECLAIM_BATCH,
+        )
+        await _process_entries(entries)
+        reclaimed += len(entries)
+        if cursor in ("0-0", b"0-0"):
+            return reclaimed
+
+
+async def _consume(consumer: str) -> None:
+    next_reclaim = 0.0
+    failures = 0
+    while True:
+        try:
+            if time.monotonic() >= next_reclaim:
+                next_reclaim = time.monotonic() + JOB_RECLAIM_INTERVAL_SECONDS
+                await _reclaim_stale(consumer)
+            response = await async_redis_client.xreadgroup(
+                jobs.CONSUMER_GROUP,
+                consumer,
+                {jobs.STREAM_KEY: ">"},
+                count=1,
+                block=READ_BLOCK_MS,
+            )
+            for _, entries in response or []:
+                await _process_entries(entries)
+        except redis.RedisError as exc:
+            # Unacknowledged jobs stay pending and are reclaimed later.
+            delay = min(ERROR_BACKOFF_CAP_SECONDS, ERROR_BACKOFF_BASE_SECONDS * 2 ** min(failures, 10))
+            failures += 1
+            print(f"{consumer}: Redis error ({exc}); retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            continue
+        failures = 0
+
+
+async def run(concurrency: int) -> None:
+    await check_async_connection()
+    # Chunked days fan out into several calls; keep the process under the cap.
+    set_max_concurrency(concurrency)
+    await jobs.ensure_group()
+    base_name = f"{socket.gethostname()}-{os.getpid()}"
+    try:
+        await asyncio.gather(*(_consume(f"{base_name}-{index}") for index in range(concurrency)))
+    finally:
+        await close_http_client()
+        await close_async_client()
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.worker", description=__doc__)
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=int(os.getenv("WORKER_CONCURRENCY", 4)),
+        help="Number of jobs processed at the same time.",
+    )
+    args = parser.parse_args(argv)
+    asyncio.run(run(args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
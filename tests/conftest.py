@@ -0,0 +1,102 @@
+"""Shared fixtures: a local stand-in for the Gemini API."""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class StubGemini:
+    """Answers POSTs with queued ``(status, delay_seconds)`` pairs, then 200s.
+
+    Successful ``streamGenerateContent`` requests send each of ``stream_events``
+    as a server-sent event; :attr:`DROP` closes the connection mid-stream.
+    """
+
+    DROP = object()
+
+    def __init__(self) -> None:
+        self.responses = []
+        self.stream_events = [{"candidates": [{"content": {"parts": [{"text": "Stub summary"}]}}]}]
+        self.requests = 0
+        self.in_flight = 0
+        self.peak = 0
+        lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with lock:
+                    stub.requests += 1
+                    stub.in_flight += 1
+                    stub.peak = max(stub.peak, stub.in_flight)
+                    status, delay = stub.responses.pop(0) if stub.responses else (200, 0.0)
+                time.sleep(delay)
+                with lock:
+                    stub.in_flight -= 1
+                if status == 200 and ":streamGenerateContent" in self.path:
+                    self._stream()
+                    return
+                body = json.dumps(
+                    {"candidates": [{"content": {"parts": [{"text": "Stub summary"}]}}]}
+                ).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _stream(self) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for event in stub.stream_events:
+                    if event is StubGemini.DROP:
+                        # End without the terminating chunk, like a dropped connection.
+                        self.wfile.flush()
+                        self.close_connection = True
+                        return
+                    data = f"data: {json.dumps(event)}\r\n\r\n".encode()
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+
+            def log_message(self, *args) -> None:
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/v1/models/stub:generateContent"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    gemini_client = pytest.importorskip("app.gemini_client")
+    server = StubGemini()
+    monkeypatch.setattr(gemini_client, "GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr(gemini_client, "GEMINI_API_URL", server.url)
+    monkeypatch.setattr(
+        gemini_client,
+        "GEMINI_STREAM_URL",
+        server.url.replace(":generateContent", ":streamGenerateContent"),
+    )
+    monkeypatch.setattr(gemini_client, "GEMINI_MAX_RETRIES", 2)
+    monkeypatch.setattr(gemini_client, "GEMINI_BACKOFF_BASE_SECONDS", 0.0)
+    monkeypatch.setattr(gemini_client, "_breaker", gemini_client.CircuitBreaker(3, 60.0))
+    monkeypatch.setattr(gemini_client, "_metrics", gemini_client.CallMetrics())
+    monkeypatch.setattr(
+        gemini_client, "GEMINI_MAX_CONCURRENCY", gemini_client.GEMINI_MAX_CONCURRENCY
+    )
+    monkeypatch.setattr(gemini_client, "_call_slots", None)
+    yield server
+    server.close()
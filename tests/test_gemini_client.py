@@ -0,0 +1,155 @@
+"""Gemini client retries, circuit breaker, streaming and metrics against a local stub server."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+gemini_client = pytest.importorskip("app.gemini_client")
+
+
+def _run(coroutine):
+    async def main():
+        try:
+            return await coroutine
+        finally:
+            await gemini_client.close_http_client()
+
+    return asyncio.run(main())
+
+
+def test_retries_server_errors_then_succeeds(stub):
+    stub.responses = [(503, 0.0), (500, 0.0)]
+
+    text, from_model = _run(gemini_client.generate_summary("prompt"))
+
+    assert (text, from_model) == ("Stub summary", True)
+    assert stub.requests == 3
+    metrics = gemini_client.gemini_metrics()
+    assert metrics["retries"] == 2
+    assert metrics["outcomes"] == {"success": 1}
+    assert metrics["circuit"] == "closed"
+
+
+def test_breaker_opens_and_short_circuits(stub):
+    stub.responses = [(503, 0.0)] * 9
+
+    async def calls():
+        return [await gemini_client.generate_summary("prompt") for _ in range(4)]
+
+    results = _run(calls())
+
+    assert [from_model for _, from_model in results] == [False] * 4
+    # Three failed calls of three attempts each, then no request at all.
+    assert stub.requests == 9
+    metrics = gemini_client.gemini_metrics()
+    assert metrics["outcomes"] == {"error": 3, "short_circuited": 1}
+    assert metrics["circuit"] == "open"
+
+
+def test_rejected_requests_do_not_open_the_breaker(stub):
+    stub.responses = [(400, 0.0)] * 4 + [(413, 0.0)]
+
+    async def calls():
+        for _ in range(4):
+            with pytest.raises(gemini_client.GeminiRequestError):
+                await gemini_client._call_gemini("prompt")
+        return [chunk async for chunk in gemini_client.stream_summary("prompt")]
+
+    chunks = _run(calls())
+
+    assert chunks and all(from_model is False for _, from_model in chunks)
+    # Client errors are not retried and never count as upstream failures.
+    assert stub.requests == 5
+    metrics = gemini_client.gemini_metrics()
+    assert metrics["outcomes"] == {"rejected": 5}
+    assert metrics["circuit"] == "closed"
+
+
+def test_cancelled_half_open_trial_releases_the_breaker(stub):
+    breaker = gemini_client._breaker
+    breaker.failures = breaker.threshold
+    breaker.opened_at = time.monotonic() - breaker.reset_seconds
+    stub.responses = [(200, 0.5)]
+
+    async def cancel_trial_then_call():
+        trial = asyncio.create_task(gemini_client.generate_summary("prompt"))
+        await asyncio.sleep(0.1)
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+        return await gemini_client.generate_summary("prompt")
+
+    text, from_model = _run(cancel_trial_then_call())
+
+    assert (text, from_model) == ("Stub summary", True)
+    assert gemini_client.gemini_metrics()["circuit"] == "closed"
+
+
+def test_concurrent_calls_share_the_process_cap(stub):
+    gemini_client.set_max_concurrency(2)
+    stub.responses = [(200, 0.2)] * 6
+
+    async def calls():
+        return await asyncio.gather(*(gemini_client.generate_summary("prompt") for _ in range(6)))
+
+    results = _run(calls())
+
+    assert [from_model for _, from_model in results] == [True] * 6
+    assert stub.peak == 2
+
+
+def _stream(prompt):
+    async def collect():
+        chunks = []
+        try:
+            async for chunk in gemini_client.stream_summary(prompt):
+                chunks.append(chunk)
+        except gemini_client.GeminiClientError as exc:
+            chunks.append(exc)
+        return chunks
+
+    return _run(collect())
+
+
+def _text_event(text):
+    return {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}}]}
+
+
+def test_stream_yields_model_text(stub):
+    stub.stream_events = [_text_event("Hello "), _text_event("world")]
+
+    assert _stream("prompt") == [("Hello ", True), ("world", True)]
+    assert gemini_client.gemini_metrics()["outcomes"] == {"success": 1}
+
+
+def test_stream_ignores_finish_and_usage_chunks(stub):
+    stub.stream_events = [
+        _text_event("Hello "),
+        {"candidates": [{"content": {"role": "model"}, "finishReason": "STOP"}]},
+        {"usageMetadata": {"promptTokenCount": 3, "totalTokenCount": 5}},
+    ]
+
+    assert _stream("prompt") == [("Hello ", True)]
+    assert gemini_client.gemini_metrics()["outcomes"] == {"success": 1}
+
+
+def test_stream_falls_back_before_the_first_chunk(stub):
+    stub.responses = [(503, 0.0)]
+
+    chunks = _stream("Today I went climbing with friends.")
+
+    assert chunks and all(from_model is False for _, from_model in chunks)
+    assert gemini_client.gemini_metrics()["outcomes"] == {"error": 1}
+
+
+def test_stream_error_after_text_is_raised(stub):
+    stub.stream_events = [_text_event("Hello "), stub.DROP]
+
+    chunks = _stream("prompt")
+
+    assert chunks[0] == ("Hello ", True)
+    assert isinstance(chunks[1], gemini_client.GeminiClientError)
+    assert len(chunks) == 2
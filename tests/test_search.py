@@ -0,0 +1,59 @@
+"""Search answers against a Redis server and the local Gemini stub.
+
+These tests write to the Redis at ``REDIS_URL`` under a throwaway user, so
+point it at a scratch database; they are skipped when no server is reachable.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("numpy")
+
+try:
+    from app import diary, search
+except RuntimeError as exc:  # RedisConfigurationError
+    pytest.skip(f"Redis is not available: {exc}", allow_module_level=True)
+
+from app.gemini_client import close_http_client  # noqa: E402
+from app.models import ChatMessage, SearchQuery  # noqa: E402
+from app.redis_client import async_redis_client, close_async_client  # noqa: E402
+
+
+def _run(username, coroutine):
+    async def main():
+        try:
+            return await coroutine
+        finally:
+            keys = [key async for key in async_redis_client.scan_iter(match=f"*{username}*")]
+            if keys:
+                await async_redis_client.delete(*keys)
+            await close_http_client()
+            await close_async_client()
+
+    return asyncio.run(main())
+
+
+def test_search_lists_matches_when_gemini_is_unavailable(stub):
+    stub.responses = [(503, 0.0)] * 3
+    username = f"test-{uuid.uuid4().hex}"
+    message = ChatMessage(
+        message_id=str(uuid.uuid4()),
+        role="user",
+        text="Long day at work finishing the quarterly report",
+        timestamp=datetime.now(timezone.utc),
+    )
+
+    async def scenario():
+        await diary._store_messages(username, [message])
+        return await search.search_diary(SearchQuery(query="quarterly report"), username=username)
+
+    result = _run(username, scenario())
+
+    assert stub.requests == 3
+    assert result.answer == message.text